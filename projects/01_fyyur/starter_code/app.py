@@ -5,7 +5,9 @@
 import json
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from functools import lru_cache
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -13,9 +15,14 @@ import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
-from models import db, Venue, Artist, Show
+from models import db, Venue, Artist, Show, Genre
+from search import search
+from cache import PageCache, MemoryBackend
+from config import load_config
+from importer import IMPORTERS, IMPORT_BATCH_SIZE, read_rows, import_rows
 import sys
-import re
+import click
+from itertools import groupby
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -23,13 +30,42 @@ import re
 
 app = Flask(__name__)
 moment = Moment(app)
-app.config.from_object('config')
+load_config(app)
 db.init_app(app)
 
 # TODO: connect to a local postgresql database
-# Local postgres URI provided in config.py
-# Connection is established with local database fyyurdb
+# Database URI, pool sizing and timeouts come from the FYYUR_ENV profile in config.py
+# (local database fyyurdb by default in development)
 migrate = Migrate(app, db)
+page_cache = PageCache(app)
+
+# Bulk import, e.g. "flask import-data venues venues.csv" (see importer.py)
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option('--show-rejected', default=20, show_default=True, help='Rejected rows to print.')
+def import_data(kind, path, batch_size, show_rejected):
+  '''Imports KIND rows from a CSV or NDJSON file. With the default memory page cache, running
+  servers show the new rows once their cached pages expire (PAGE_CACHE_TTL); use
+  PAGE_CACHE_BACKEND=redis to have them show up at once.'''
+  def progress(report):
+    click.echo(f'  {report.imported} imported, {len(report.rejected)} rejected')
+
+  report = import_rows(kind, read_rows(path), batch_size, on_batch=progress)
+  if isinstance(page_cache.backend, MemoryBackend):
+    # This process' cache is not the servers', they only see the import after the TTL
+    click.echo(f'Note: pages cached by running servers expire within {page_cache.ttl}s '
+               f'(PAGE_CACHE_BACKEND=redis shows imports at once)')
+  else:
+    page_cache.invalidate('venues', 'artists', 'shows')
+
+  click.echo(f'Imported {report.imported} {kind} in {report.elapsed:.2f}s '
+             f'({report.rows_per_second:.0f} rows/s), rejected {len(report.rejected)}')
+  for line_number, reason in sorted(report.rejected)[:show_rejected]:
+    click.echo(f'  line {line_number}: {reason}')
+
+SHOWS_PER_PAGE = 30
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -40,15 +76,51 @@ migrate = Migrate(app, db)
 #----------------------------------------------------------------------------#
 # My Helper Functions
 #----------------------------------------------------------------------------#
-# Proprietary function to sort out genres
-def modify_genres(genre_data):
-  # join incoming list with elements with a "*"
-  join_delimeter = '*'
-  joined_genres_list = join_delimeter.join(genre_data)
-  # Use regex to replace special characters with ', ' to match what we need "a, b, c"
-  special_characters = '[^A-Za-z0-9*& ]'
-  genres = re.sub(special_characters, '', joined_genres_list).replace(join_delimeter, ', ')
-  return genres
+# Resolve genre names to Genre rows with one lookup, adding any that are new
+def find_or_create_genres(genre_names):
+  existing = {genre.name: genre for genre in Genre.query.filter(Genre.name.in_(genre_names))}
+  return [existing.get(name) or Genre(name=name) for name in genre_names]
+
+# Fold venue rows (ordered by state, city) into the areas structure of venues.html
+def group_venues_by_area(venue_rows):
+  areas = []
+  for (city, state), area_venues in groupby(venue_rows, key=lambda row: (row.city, row.state)):
+    areas.append({
+      'city': city,
+      'state': state,
+      'venues': list(area_venues),
+    })
+  return areas
+
+# Partition show rows (selected with an 'upcoming' flag computed in SQL) into upcoming and past
+def split_shows(show_rows):
+  upcoming_shows, past_shows = [], []
+  for show in show_rows:
+    (upcoming_shows if show.upcoming else past_shows).append(show)
+  return upcoming_shows, past_shows
+
+# Keyset cursor for /shows: the (start_time, id) of the last show on a page
+def encode_show_cursor(show):
+  return f'{show.start_time.isoformat()}_{show.id}'
+
+def decode_show_cursor(cursor):
+  start_time, show_id = cursor.rsplit('_', 1)
+  return datetime.fromisoformat(start_time), int(show_id)
+
+# Parse an optional YYYY-MM-DD query argument, raises ValueError if malformed
+def parse_date_arg(name):
+  value = request.args.get(name)
+  return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+# Page cache tags whose pages show a venue or artist: its own page, the listings,
+# and the pages of everyone it shares a show with (names/images appear there)
+def venue_page_tags(venue_id):
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  return ['venues', 'shows', f'venue:{venue_id}'] + [f'artist:{artist_id}' for (artist_id,) in artist_ids]
+
+def artist_page_tags(artist_id):
+  venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  return ['artists', 'shows', f'artist:{artist_id}'] + [f'venue:{venue_id}' for (venue_id,) in venue_ids]
 
 def form_error_handling(form):
   message = []
@@ -60,13 +132,26 @@ def form_error_handling(form):
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+# Babel pattern and locale are parsed once per (format, locale)
+@lru_cache(maxsize=None)
+def compiled_datetime_format(format, locale):
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+# Show listings repeat the same start times, so memoize the formatted strings
+@lru_cache(maxsize=4096)
+def format_datetime_cached(date, format, locale):
+  pattern, babel_locale = compiled_datetime_format(format, locale)
+  return pattern.apply(date, babel_locale)
+
+def format_datetime(value, format='medium', locale='en'):
+  # Accepts datetime objects directly; strings are still parsed for older callers
+  date = value if isinstance(value, datetime) else dateutil.parser.parse(str(value))
+  return format_datetime_cached(date, format, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
@@ -83,24 +168,30 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@page_cache.cached('venues')
 def venues():
   # TODO: replace with real venues data.
 
-  # Group venues by city and state, filter by city and state, fetch ID and Name of the venue
+  # One query for every venue plus its upcoming show count, ordered by area,
+  # then grouped by city and state in a single pass - no query per area.
+  # Optional filters: ?genre=Jazz&state=CA
   venue_data = []
   try:
-    city_state_group = Venue.query.with_entities(Venue.city, Venue.state).group_by(
-      Venue.city, Venue.state).all()
-
-    for city, state in city_state_group:
-      venue = Venue.query.with_entities(Venue.id, Venue.name).filter_by(
-        city=city, state=state).order_by('id').all()
-      
-      venue_data.append({
-        'city': city,
-        'state': state,
-        'venues': venue,
-      })
+    venue_query = db.session.query(
+      Venue.id, Venue.name, Venue.city, Venue.state,
+      db.func.count(Show.id).label('num_upcoming_shows')
+    ).outerjoin(Show, db.and_(
+      Show.venue_id == Venue.id, Show.start_time > datetime.now()))
+
+    genre, state = request.args.get('genre'), request.args.get('state')
+    if genre:
+      venue_query = venue_query.filter(Venue.genres.any(Genre.name == genre))
+    if state:
+      venue_query = venue_query.filter(Venue.state == state)
+
+    venue_rows = venue_query.group_by(Venue.id).order_by(Venue.state, Venue.city, Venue.id).all()
+
+    venue_data = group_venues_by_area(venue_rows)
   except ValueError as e:
     flash(f'Error: {str(e)}')
   return render_template('pages/venues.html', areas=venue_data)
@@ -109,13 +200,14 @@ def venues():
 def search_venues():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
 
-  # Get the form input, filter on the venue model, fetch models that contain the search term
-  # Use "ilike" for case-insensitive
+  # Ranked, limited, case-insensitive partial match on name, city and genres.
+  # Served by the pg_trgm indexes on PostgreSQL, an in-memory n-gram index elsewhere
+  response = {'count': 0, 'data': []}
   try:
-    search_input = request.form.get('search_term')
-    venue_results = Venue.query.filter(Venue.name.ilike(f'%{search_input}%')).all()
+    search_input = request.form.get('search_term', '')
+    total, venue_results = search(Venue, search_input)
     response={
-      'count': len(venue_results),
+      'count': total,
       'data': venue_results
     }
   except ValueError as e:
@@ -123,39 +215,36 @@ def search_venues():
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/<int:venue_id>')
+@page_cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # TODO: replace with real venue data from the venues table, using venue_id
 
-  # Filter the artist table and fetch the artist requested
-  # Initialise containers for counting past and upcoming show, 
+  # Fetch the venue, then all of its shows joined to their artists in one query.
+  # Past vs upcoming is decided by the database, so no per-show lazy loads
   show_venue_data = {}
-  show_venue_data['upcoming_shows'] = []
-  show_venue_data['past_shows']= []
-  show_venue_data['upcoming_shows_count'] = 0
-  show_venue_data['past_shows_count'] = 0
-
   venue_data = Venue.query.get_or_404(venue_id)
 
   try:
-    # If artist exist, now get shows related to artist and deduce upcoming and past shows, utilise relationship
-    shows_data = venue_data.shows
-    # For all shows...
-    for show in shows_data:
-      show.artist_name = show.artist.name
-      show.artist_image_link = show.artist.image_link
-      if show.start_time > datetime.now(): # In the future...
-        show.start_time = format_datetime(str(show.start_time))
-        show_venue_data['upcoming_shows'].append(show)
-        show_venue_data['upcoming_shows_count'] += 1
-      else: # Past...
-        show.start_time = format_datetime(str(show.start_time))
-        show_venue_data['past_shows'].append(show)
-        show_venue_data['past_shows_count'] += 1
+    show_rows = db.session.query(
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'),
+      Show.start_time,
+      (Show.start_time > datetime.now()).label('upcoming')
+    ).join(Artist, Show.artist_id == Artist.id).filter(
+      Show.venue_id == venue_id).order_by(Show.start_time).all()
+
+    upcoming_shows, past_shows = split_shows(show_rows)
+    show_venue_data['upcoming_shows'] = upcoming_shows
+    show_venue_data['past_shows'] = past_shows
+    show_venue_data['upcoming_shows_count'] = len(upcoming_shows)
+    show_venue_data['past_shows_count'] = len(past_shows)
+
     # Now construct the rest of the data that is straight forward
     show_venue_data['id'] = venue_data.id
     show_venue_data['name'] = venue_data.name
-    show_venue_data['genres'] = venue_data.genres.split(',')
+    show_venue_data['genres'] = venue_data.genre_names
     show_venue_data['address'] = venue_data.address
     show_venue_data['city'] = venue_data.city
     show_venue_data['state'] = venue_data.state
@@ -197,13 +286,14 @@ def create_venue_submission():
         image_link = incoming_venue_data.image_link.data,
         facebook_link = incoming_venue_data.facebook_link.data,
         website_link = incoming_venue_data.website_link.data,
-        genres = modify_genres(incoming_venue_data.genres.data),
+        genres = find_or_create_genres(modify_genres(incoming_venue_data.genres.data)),
         seeking_talent = incoming_venue_data.seeking_talent.data,
         seeking_description = incoming_venue_data.seeking_description.data,
       )
       # Now add and commit Venue table to the database so that we are using real data
       db.session.add(new_venue_data)
       db.session.commit()
+      page_cache.invalidate('venues')
       flash(f'Venue {incoming_venue_data.name.data} was successfully listed!')
     except ValueError as e:
       db.session.rollback()
@@ -222,8 +312,10 @@ def delete_venue(venue_id):
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
   try:
     venue_data = Venue.query.get(venue_id)
+    cache_tags = venue_page_tags(venue_data.id)
     db.session.delete(venue_data)
     db.session.commit()
+    page_cache.invalidate(*cache_tags)
     flash(f'Venue {venue_data.name} deleted!')
   except ValueError as e:
     db.session.rollback()
@@ -238,11 +330,22 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@page_cache.cached('artists')
 def artists():
   # TODO: replace with real data returned from querying the database
-  # Extract ALL IDs and names of of artists from the model, order by ID 
+  # Extract ALL IDs and names of of artists from the model, order by ID
+  # Optional filters: ?genre=Jazz&state=CA
+  artist_data = []
   try:
-    artist_data = Artist.query.with_entities(Artist.id, Artist.name).order_by('id').all()
+    artist_query = Artist.query.with_entities(Artist.id, Artist.name)
+
+    genre, state = request.args.get('genre'), request.args.get('state')
+    if genre:
+      artist_query = artist_query.filter(Artist.genres.any(Genre.name == genre))
+    if state:
+      artist_query = artist_query.filter(Artist.state == state)
+
+    artist_data = artist_query.order_by('id').all()
   except ValueError as e:
     flash(f'Error: {str(e)}')
   return render_template('pages/artists.html', artists=artist_data)
@@ -252,11 +355,13 @@ def search_artists():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
+  # Ranked, limited, case-insensitive partial match on name, city and genres
+  response = {'count': 0, 'data': []}
   try:
-    search_input = request.form.get('search_term')
-    artist_results = Artist.query.filter(Artist.name.ilike(f'%{search_input}%')).all()
+    search_input = request.form.get('search_term', '')
+    total, artist_results = search(Artist, search_input)
     response={
-      'count': len(artist_results),
+      'count': total,
       'data': artist_results
     }
   except ValueError as e:
@@ -264,40 +369,36 @@ def search_artists():
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
+@page_cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
   # TODO: replace with real artist data from the artist table, using artist_id
 
-  # Filter the artist table and fetch the artist requested
-  artist_data = Artist.query.get_or_404(artist_id)
-  # Get the shows. Initialise containers for counting past and upcoming show
+  # Fetch the artist, then all of their shows joined to their venues in one query.
+  # Past vs upcoming is decided by the database, so no per-show lazy loads
   show_artist_data = {}
-  show_artist_data['upcoming_shows'] = []
-  show_artist_data['past_shows'] = []
-  show_artist_data['upcoming_shows_count'] = 0
-  show_artist_data['past_shows_count'] = 0
-  
-  # If artist exist, now get shows related to artist and deduce upcoming and past shows
+  artist_data = Artist.query.get_or_404(artist_id)
+
   try:
-    shows_data = artist_data.shows
-    # For all shows...
-    for show in shows_data:
-      #show.id = show.venue.id
-      show.venue_name = show.venue.name
-      show.venue_image_link = show.venue.image_link
-      if show.start_time > datetime.now(): # In the future...
-        show.start_time = format_datetime(str(show.start_time))
-        show_artist_data['upcoming_shows'].append(show)
-        show_artist_data['upcoming_shows_count'] += 1
-      else: # Past...
-        show.start_time = format_datetime(str(show.start_time))
-        show_artist_data['past_shows'].append(show)
-        show_artist_data['past_shows_count'] += 1
+    show_rows = db.session.query(
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Venue.image_link.label('venue_image_link'),
+      Show.start_time,
+      (Show.start_time > datetime.now()).label('upcoming')
+    ).join(Venue, Show.venue_id == Venue.id).filter(
+      Show.artist_id == artist_id).order_by(Show.start_time).all()
+
+    upcoming_shows, past_shows = split_shows(show_rows)
+    show_artist_data['upcoming_shows'] = upcoming_shows
+    show_artist_data['past_shows'] = past_shows
+    show_artist_data['upcoming_shows_count'] = len(upcoming_shows)
+    show_artist_data['past_shows_count'] = len(past_shows)
 
     # Now construct the rest of the data that is straight forward
     show_artist_data['id'] = artist_data.id
     show_artist_data['name'] = artist_data.name
-    show_artist_data['genres'] = artist_data.genres.split(',')
+    show_artist_data['genres'] = artist_data.genre_names
     show_artist_data['city'] = artist_data.city
     show_artist_data['state'] = artist_data.state
     show_artist_data['phone'] = artist_data.phone
@@ -316,6 +417,7 @@ def show_artist(artist_id):
 def edit_artist(artist_id):
   artist = Artist.query.get_or_404(artist_id)
   form = ArtistForm(obj=artist)
+  form.genres.data = artist.genre_names
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
   # TODO: populate form with fields from artist with ID <artist_id>
@@ -336,7 +438,7 @@ def edit_artist_submission(artist_id):
       artist.city = form.city.data
       artist.state = form.state.data
       artist.phone = form.phone.data
-      artist.genres = modify_genres(form.genres.data)
+      artist.genres = find_or_create_genres(modify_genres(form.genres.data))
       artist.image_link = form.image_link.data
       artist.facebook_link = form.facebook_link.data
       artist.website_link = form.website_link.data
@@ -344,6 +446,7 @@ def edit_artist_submission(artist_id):
       artist.seeking_description = form.seeking_description.data
 
       db.session.commit()
+      page_cache.invalidate(*artist_page_tags(artist_id))
       flash(f'Artist {form.name.data} was successfully edited!')
     except ValueError as e:
       db.session.rollback()
@@ -361,6 +464,7 @@ def edit_artist_submission(artist_id):
 def edit_venue(venue_id):
   venue = Venue.query.get_or_404(venue_id)
   form = VenueForm(obj=venue)
+  form.genres.data = venue.genre_names
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
   # # TODO: populate form with values from venue with ID <venue_id>
@@ -381,7 +485,7 @@ def edit_venue_submission(venue_id):
       venue.city = form.city.data
       venue.state = form.state.data
       venue.phone = form.phone.data
-      venue.genres = modify_genres(form.genres.data)
+      venue.genres = find_or_create_genres(modify_genres(form.genres.data))
       venue.image_link = form.image_link.data
       venue.facebook_link = form.facebook_link.data
       venue.website_link = form.website_link.data
@@ -389,6 +493,7 @@ def edit_venue_submission(venue_id):
       venue.seeking_description = form.seeking_description.data
 
       db.session.commit()
+      page_cache.invalidate(*venue_page_tags(venue_id))
       flash(f'Venue {form.name.data} was successfully edited!')
     except ValueError as e:
       db.session.rollback()
@@ -426,7 +531,7 @@ def create_artist_submission():
         city = incoming_artist_data.city.data,
         state = incoming_artist_data.state.data,
         phone = incoming_artist_data.phone.data,
-        genres =  modify_genres(incoming_artist_data.genres.data),
+        genres = find_or_create_genres(modify_genres(incoming_artist_data.genres.data)),
         image_link = incoming_artist_data.image_link.data,
         facebook_link = incoming_artist_data.facebook_link.data,
         website_link = incoming_artist_data.website_link.data,
@@ -436,6 +541,7 @@ def create_artist_submission():
       # Add and commit artist table data to database
       db.session.add(new_artist_data)
       db.session.commit()
+      page_cache.invalidate('artists')
       flash(f'Artist {incoming_artist_data.name.data} was successfully listed!')
     except ValueError as e:
       # If there are any errors, rollback changes
@@ -454,28 +560,59 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@page_cache.cached('shows')
 def shows():
   # displays list of shows at /shows
   # TODO: replace with real venues data.
   #       num_shows should be aggregated based on number of upcoming shows per venue.
 
-  # Get all the data from show model, order them by earliest start time
-  # Use relationship built into models to extract venue and artist information
-  # This is where the backref comes into play
-  show_data = Show.query.order_by('start_time').all()
-  new_show_data = []
-  for show in show_data:
-    # Creating and assigning show details in the structure required
-    show.venue_id = show.venue.id
-    show.venue_name = show.venue.name
-    show.artist_id = show.artist.id
-    show.artist_name = show.artist.name
-    show.artist_image_link = show.artist.image_link
-    show.start_time = format_datetime(str(show.start_time))
-
-    # Append the show detail into the overall container that will list all shows
-    new_show_data.append(show)
-  return render_template('pages/shows.html', shows=new_show_data)
+  # Keyset pagination on (start_time, id): each page is one joined query over only the
+  # displayed columns, resuming after the cursor instead of loading every show.
+  # Optional filters: ?upcoming=1, ?from=YYYY-MM-DD, ?to=YYYY-MM-DD (exclusive)
+  filters = {
+    'upcoming': request.args.get('upcoming', type=int),
+    'from': request.args.get('from'),
+    'to': request.args.get('to'),
+  }
+  limit = min(max(request.args.get('limit', SHOWS_PER_PAGE, type=int), 1), 100)
+  show_data = []
+  next_page_url = None
+
+  try:
+    show_query = db.session.query(
+      Show.id,
+      Show.start_time,
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+
+    if filters['upcoming']:
+      show_query = show_query.filter(Show.start_time > datetime.now())
+    date_from, date_to = parse_date_arg('from'), parse_date_arg('to')
+    if date_from:
+      show_query = show_query.filter(Show.start_time >= date_from)
+    if date_to:
+      show_query = show_query.filter(Show.start_time < date_to)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+      cursor_time, cursor_id = decode_show_cursor(cursor)
+      show_query = show_query.filter(db.or_(
+        Show.start_time > cursor_time,
+        db.and_(Show.start_time == cursor_time, Show.id > cursor_id)))
+
+    # Fetch one extra row to know whether there is a next page
+    show_data = show_query.order_by(Show.start_time, Show.id).limit(limit + 1).all()
+    if len(show_data) > limit:
+      show_data = show_data[:limit]
+      next_page_url = url_for('shows', cursor=encode_show_cursor(show_data[-1]), limit=limit,
+                              **{key: value for key, value in filters.items() if value})
+  except ValueError as e:
+    flash(f'Error: {str(e)}')
+  return render_template('pages/shows.html', shows=show_data, next_page_url=next_page_url)
 
 @app.route('/shows/create')
 def create_shows():
@@ -506,6 +643,7 @@ def create_show_submission():
         # Adding and commiting to database
         db.session.add(new_show_data)
         db.session.commit()
+        page_cache.invalidate('shows', 'venues', f'venue:{new_show_data.venue_id}', f'artist:{new_show_data.artist_id}')
         flash('Show was successfully listed!')
       except ValueError as e:
         # If errors occur, roll back changes to database
@@ -524,6 +662,14 @@ def create_show_submission():
   return redirect(url_for(return_page))
 
 
+#  Page cache
+#  ----------------------------------------------------------------
+
+@app.route('/cache/stats')
+def cache_stats():
+  return jsonify(page_cache.stats())
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -0,0 +1,206 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+#----------------------------------------------------------------------------#
+# Seeds a throwaway database and drives the app through the Flask test
+# client, counting the SQL statements each page issues and checking their
+# query plans. Runs the testing profile, so in-memory SQLite by default; point
+# TEST_DATABASE_URL at an empty PostgreSQL database to check the real plans
+# (its tables are dropped).
+#
+#   python bench.py
+#----------------------------------------------------------------------------#
+import os
+import time
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from sqlalchemy import event
+
+os.environ['FYYUR_ENV'] = 'testing'
+from app import app, format_datetime, format_datetime_cached
+from models import db, Venue, Artist, Show
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def seed_areas(num_areas, venues_per_area=2):
+    db.drop_all()
+    db.create_all()
+    db.session.bulk_insert_mappings(Venue, [{
+        'name': f'Venue {area}-{n}',
+        'city': f'City {area}',
+        'state': 'CA',
+        'address': f'{n} Main St',
+        'facebook_link': 'https://www.facebook.com/venue',
+    } for area in range(num_areas) for n in range(venues_per_area)])
+    db.session.bulk_insert_mappings(Artist, [{
+        'name': 'Artist', 'city': 'City 0', 'state': 'CA', 'phone': '326-123-5000',
+        'facebook_link': 'https://www.facebook.com/artist',
+    }])
+    db.session.bulk_insert_mappings(Show, [{
+        'venue_id': venue_id, 'artist_id': 1,
+        'start_time': datetime.now() + timedelta(days=venue_id % 2 and 30 or -30),
+    } for venue_id in range(1, num_areas * venues_per_area + 1)])
+    db.session.commit()
+
+
+def bench_venues(area_sizes=(10, 100, 1000, 5000)):
+    print('GET /venues')
+    client = app.test_client()
+    for num_areas in area_sizes:
+        seed_areas(num_areas)
+        with QueryCounter(db.engine) as counter:
+            start = time.perf_counter()
+            response = client.get('/venues')
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200
+        print(f'  {num_areas:>6} areas: {counter.count} queries, {elapsed * 1000:.1f} ms')
+
+
+def seed_show_history(num_shows):
+    seed_areas(1, venues_per_area=1)
+    db.session.bulk_insert_mappings(Show, [{
+        'venue_id': 1, 'artist_id': 1,
+        'start_time': datetime.now() - timedelta(hours=n),
+    } for n in range(num_shows)])
+    db.session.commit()
+
+
+def bench_show_pages(show_counts=(10, 1000, 5000)):
+    print('GET /venues/<id>, /artists/<id>')
+    client = app.test_client()
+    for num_shows in show_counts:
+        seed_show_history(num_shows)
+        for url in ('/venues/1', '/artists/1'):
+            with QueryCounter(db.engine) as counter:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            assert response.status_code == 200
+            print(f'  {url:<11} {num_shows:>6} shows: {counter.count} queries, {elapsed * 1000:.1f} ms')
+
+
+def bench_shows(show_counts=(1000, 20000)):
+    print('GET /shows')
+    client = app.test_client()
+    for num_shows in show_counts:
+        seed_show_history(num_shows)
+        for label, url in (('first page', '/shows'), ('upcoming', '/shows?upcoming=1')):
+            with QueryCounter(db.engine) as counter:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            assert response.status_code == 200
+            print(f'  {label:<11} {num_shows:>6} shows: {counter.count} queries, {elapsed * 1000:.1f} ms')
+
+
+def legacy_format_datetime(value, format='full'):
+    # format_datetime as it was: string round trip and a Babel pattern parse per call
+    date = dateutil.parser.parse(str(value))
+    format = "EEEE MMMM, d, y 'at' h:mma" if format == 'full' else "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def bench_format_datetime(number=20000):
+    print('datetime filter, per call')
+    # Repeating timestamps (listings) and all distinct ones (cold LRU on every call)
+    repeated = [datetime(2035, 4, 1, 20) + timedelta(hours=n % 50) for n in range(number)]
+    distinct = [datetime(2035, 4, 1, 20) + timedelta(minutes=n) for n in range(number)]
+    assert all(format_datetime(d, 'full') == legacy_format_datetime(d) for d in repeated[:100])
+
+    for label, values in (('repeated', repeated), ('distinct', distinct)):
+        for name, formatter in (('before', legacy_format_datetime), ('after', format_datetime)):
+            format_datetime_cached.cache_clear()
+            elapsed = timeit.timeit(lambda: [formatter(d, 'full') for d in values], number=1)
+            print(f'  {label:<9} {name:<7} {elapsed / number * 1e6:.2f} us')
+
+
+class QueryRecorder(QueryCounter):
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.statements = []
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append((statement, parameters))
+
+
+# Tables that grow with the catalogue and must never be read with a full scan.
+# The directory pages list every venue/artist, so scanning those is expected
+INDEXED_TABLES = ('Show', 'venue_genres', 'artist_genres')
+
+def full_scans(statement, parameters, tables=INDEXED_TABLES):
+    raw_connection = db.engine.raw_connection()
+    try:
+        cursor = raw_connection.cursor()
+        if db.engine.dialect.name == 'postgresql':
+            # A tiny seeded table is cheaper to seq scan, ask the planner what it can use
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + statement, parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+            return [line for line in plan
+                    if any(f'Seq Scan on "{table}"' in line or f'Seq Scan on {table}' in line
+                           for table in tables)]
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        plan = [row[-1] for row in cursor.fetchall()]
+        return [line for line in plan
+                if any(line.startswith(f'SCAN {table}') and 'USING' not in line
+                       for table in tables)]
+    finally:
+        raw_connection.close()
+
+
+def check_query_plans():
+    print('Query plans (hot pages must not full scan ' + ', '.join(INDEXED_TABLES) +
+          ', search must not scan Venue/Artist either)')
+    seed_show_history(1000)
+    client = app.test_client()
+    pages = ['/venues', '/venues?genre=Jazz&state=CA', '/venues/1', '/artists?genre=Jazz',
+             '/artists/1', '/shows', '/shows?upcoming=1&from=2020-01-01&to=2100-01-01']
+    cursor = client.get('/shows?limit=5').get_data(as_text=True).split('cursor=')[1].split('&')[0]
+    pages.append(f'/shows?cursor={cursor}')
+
+    checks = [(url, lambda url=url: client.get(url), INDEXED_TABLES) for url in pages]
+    # Search must answer from the trigram indexes (PostgreSQL) or the in-memory
+    # index, so it may not scan the directory table either
+    for url, table in (('/venues/search', 'Venue'), ('/artists/search', 'Artist')):
+        search_page = lambda url=url: client.post(url, data={'search_term': 'City 0'})
+        search_page()  # builds the in-memory index outside the recording
+        checks.append((f'POST {url}', search_page, INDEXED_TABLES + (table,)))
+
+    failures = []
+    for url, fetch, tables in checks:
+        with QueryRecorder(db.engine) as recorder:
+            assert fetch().status_code == 200
+        scans = [line for statement, parameters in recorder.statements
+                 for line in full_scans(statement, parameters, tables)]
+        print(f'  {url:<52} {"FULL SCAN: " + "; ".join(scans) if scans else "ok"}')
+        if scans:
+            failures.append(url)
+    assert not failures, f'full table scans in: {failures}'
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        bench_venues()
+        bench_show_pages()
+        bench_shows()
+        check_query_plans()
+    bench_format_datetime()
@@ -0,0 +1,174 @@
+#----------------------------------------------------------------------------#
+# Imports.
+#----------------------------------------------------------------------------#
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import g, request, session, make_response
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+# A backend stores rendered pages (get/set with a TTL) and tag version
+# counters (get_counters/incr). Counters are never evicted, otherwise a
+# bumped tag could fall back to an old version and resurrect stale pages.
+
+class MemoryBackend:
+    '''In-process LRU with per-entry TTL, shared by the threads of one worker.'''
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_counters(self, keys):
+        with self.lock:
+            return [self.counters.get(key, 0) for key in keys]
+
+    def incr(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+
+class RedisBackend:
+    '''
+    Shares the cache between workers through a Redis-compatible client.
+    Anything with get/set(ex=)/mget/incr works, so a local stand-in can be passed in tests.
+    '''
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def get_counters(self, keys):
+        return [int(value or 0) for value in self.client.mget([self.prefix + key for key in keys])]
+
+    def incr(self, key):
+        self.client.incr(self.prefix + key)
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+class PageCache:
+    '''
+    Caches rendered GET pages keyed by path + query args and the versions of
+    the page's tags (e.g. 'venues', 'venue:3'). Write handlers call
+    invalidate() with the tags they touch, which bumps those versions so every
+    dependent page misses on its next request.
+
+    Config: PAGE_CACHE_BACKEND ('memory', 'redis' or None to disable),
+    PAGE_CACHE_TTL (seconds), PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_REDIS_URL.
+    '''
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        if self.backend is not None:
+            return
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024))
+        elif backend == 'redis':
+            # Optional dependency, only needed when the redis backend is configured
+            import redis
+            self.backend = RedisBackend(redis.Redis.from_url(app.config['PAGE_CACHE_REDIS_URL']))
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def cached(self, *tags):
+        '''
+        Decorator for GET views. Tags may reference view arguments,
+        e.g. @page_cache.cached('venue:{venue_id}').
+        '''
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                # Pages carrying flashed messages are one-offs, never serve or store them
+                if self.backend is None or request.method != 'GET' or session.get('_flashes'):
+                    return f(*args, **kwargs)
+
+                page_tags = [tag.format(**kwargs) for tag in tags]
+                versions = self.backend.get_counters([f'tag:{tag}' for tag in page_tags])
+                key = 'page:{}?{}|{}'.format(
+                    request.path,
+                    urlencode(sorted(request.args.items(multi=True))),
+                    ','.join(f'{tag}={version}' for tag, version in zip(page_tags, versions)))
+
+                body = self.backend.get(key)
+                if body is not None:
+                    self._count('hits')
+                    response = make_response(body)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count('misses')
+                # A replica may lag behind the write that bumped the tags, and the
+                # page would be stored under the new versions: render from the primary
+                g.read_from_primary = True
+                rv = f(*args, **kwargs)
+                if isinstance(rv, str):
+                    self.backend.set(key, rv, self.ttl)
+                response = make_response(rv)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in set(tags):
+            self.backend.incr(f'tag:{tag}')
+        self._count('invalidations')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
@@ -1,13 +1,138 @@
 import os
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+#----------------------------------------------------------------------------#
+# Profiles.
+#----------------------------------------------------------------------------#
+# Pick one with FYYUR_ENV=development|testing|production (default development).
+# Every setting can be overridden through the environment variable of the same name.
+#
+# Size the pool to the server: each gunicorn worker holds up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so workers * that total
+# (plus any replica pool) must stay under PostgreSQL's max_connections.
 
-# Connect to the database
+def env(name, default=None, cast=str):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
 
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://lawalhassan@localhost:5432/fyyurdb'
+class Config:
+    SECRET_KEY = env('SECRET_KEY') or os.urandom(32)
+    DEBUG = False
+    TESTING = False
+
+    # Connect to the database
+    SQLALCHEMY_DATABASE_URI = env('DATABASE_URL', 'postgresql://lawalhassan@localhost:5432/fyyurdb')
+    # Optional read replica, GET requests read from it when set, except pages rendered
+    # for the page cache (see models.RoutingSession)
+    DATABASE_REPLICA_URL = env('DATABASE_REPLICA_URL')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool, applied to every non-SQLite engine
+    DB_POOL_SIZE = env('DB_POOL_SIZE', 5, int)
+    DB_MAX_OVERFLOW = env('DB_MAX_OVERFLOW', 5, int)
+    DB_POOL_TIMEOUT = env('DB_POOL_TIMEOUT', 10, int)
+    DB_POOL_RECYCLE = env('DB_POOL_RECYCLE', 1800, int)
+    DB_POOL_PRE_PING = env('DB_POOL_PRE_PING', True, bool)
+    # PostgreSQL statement_timeout in milliseconds, 0 disables it
+    DB_STATEMENT_TIMEOUT_MS = env('DB_STATEMENT_TIMEOUT_MS', 5000, int)
+
+    # Rendered page cache for the read pages (see cache.py).
+    # Backend: 'memory' (per worker LRU), 'redis' (shared, needs PAGE_CACHE_REDIS_URL) or None to disable
+    PAGE_CACHE_BACKEND = env('PAGE_CACHE_BACKEND', 'memory')
+    PAGE_CACHE_TTL = env('PAGE_CACHE_TTL', 300, int)
+    PAGE_CACHE_MAX_ENTRIES = env('PAGE_CACHE_MAX_ENTRIES', 1024, int)
+    PAGE_CACHE_REDIS_URL = env('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+
+class DevelopmentConfig(Config):
+    # Enable debug mode.
+    DEBUG = env('DEBUG', True, bool)
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = env('TEST_DATABASE_URL', 'sqlite://')
+    DATABASE_REPLICA_URL = None
+    PAGE_CACHE_BACKEND = None
+
+
+class ProductionConfig(Config):
+    # Sessions are signed with SECRET_KEY, every worker must share the same one
+    SECRET_KEY = env('SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = env('DATABASE_URL')
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
+
+#----------------------------------------------------------------------------#
+# Loading.
+#----------------------------------------------------------------------------#
+
+def normalize_database_url(url):
+    # Heroku style postgres:// URLs are not accepted by SQLAlchemy 1.4+
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        return {}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if uri.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+def validate_config(config, profile):
+    errors = []
+    if not config.get('SQLALCHEMY_DATABASE_URI'):
+        errors.append('DATABASE_URL is not set')
+    if profile == 'production':
+        if not config.get('SECRET_KEY'):
+            errors.append('SECRET_KEY must be set in production')
+        if config.get('DEBUG'):
+            errors.append('DEBUG must be off in production')
+    if config['DB_POOL_SIZE'] < 1 or config['DB_MAX_OVERFLOW'] < 0:
+        errors.append('DB_POOL_SIZE must be >= 1 and DB_MAX_OVERFLOW >= 0')
+    if config['DB_STATEMENT_TIMEOUT_MS'] < 0:
+        errors.append('DB_STATEMENT_TIMEOUT_MS must be >= 0')
+    if config.get('PAGE_CACHE_BACKEND') not in (None, 'memory', 'redis'):
+        errors.append('PAGE_CACHE_BACKEND must be memory, redis or unset')
+    if config.get('PAGE_CACHE_BACKEND') == 'redis' and not config.get('PAGE_CACHE_REDIS_URL'):
+        errors.append('PAGE_CACHE_REDIS_URL is required for the redis page cache')
+    if errors:
+        raise RuntimeError(f'Invalid {profile} configuration: ' + '; '.join(errors))
+
+
+def load_config(app, profile=None):
+    '''Loads a profile into app.config, derives the engine settings and validates the result.'''
+    profile = profile or env('FYYUR_ENV', 'development')
+    if profile not in PROFILES:
+        raise RuntimeError(f'Unknown FYYUR_ENV {profile!r}, expected one of {sorted(PROFILES)}')
+    app.config.from_object(PROFILES[profile])
+    app.config['FYYUR_ENV'] = profile
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    validate_config(app.config, profile)
+
+    if app.config['DATABASE_REPLICA_URL']:
+        app.config['SQLALCHEMY_BINDS'] = {'replica': normalize_database_url(app.config['DATABASE_REPLICA_URL'])}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
@@ -17,6 +17,17 @@ def validate_ID(form, field):
         int(field.data)
     except:
         raise ValidationError('is not an integer')
+
+# Proprietary function to sort out genres, shared by the form handlers and the bulk importer
+def modify_genres(genre_data):
+    # Strip special characters from each selected genre, dropping blanks and duplicates
+    special_characters = '[^A-Za-z0-9& ]'
+    genres = []
+    for genre in genre_data:
+        genre_name = re.sub(special_characters, '', genre).strip()
+        if genre_name and genre_name not in genres:
+            genres.append(genre_name)
+    return genres
         
 class ShowForm(Form):
     artist_id = StringField(
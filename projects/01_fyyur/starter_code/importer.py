@@ -0,0 +1,252 @@
+#----------------------------------------------------------------------------#
+# Imports.
+#----------------------------------------------------------------------------#
+import csv
+import json
+import time
+
+import dateutil.parser
+from sqlalchemy.exc import SQLAlchemyError
+from wtforms.validators import URL, ValidationError
+
+from forms import VenueForm, validate_phone, validate_ID, modify_genres
+from models import db, Venue, Artist, Show, Genre
+
+#----------------------------------------------------------------------------#
+# Config.
+#----------------------------------------------------------------------------#
+IMPORT_BATCH_SIZE = 1000
+
+STATES = {state for state, _ in VenueForm.state.kwargs['choices']}
+
+#----------------------------------------------------------------------------#
+# Reading.
+#----------------------------------------------------------------------------#
+
+def read_rows(path):
+    '''
+    Streams (line number, row) from a .csv file, a newline-delimited
+    JSON file (.ndjson/.jsonl) or, as a convenience for small files, a
+    .json file holding one array of objects. NDJSON lines are yielded
+    undecoded, import_rows() parses them (see parse_row) so one bad line
+    is rejected instead of ending the import.
+    '''
+    if path.endswith('.csv'):
+        with open(path, newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            for row in reader:
+                yield reader.line_num, row
+    elif path.endswith(('.ndjson', '.jsonl')):
+        with open(path) as json_file:
+            for line_number, line in enumerate(json_file, 1):
+                if line.strip():
+                    yield line_number, line
+    elif path.endswith('.json'):
+        with open(path) as json_file:
+            for index, row in enumerate(json.load(json_file), 1):
+                yield index, row
+    else:
+        raise ValueError(f'Unsupported file type: {path}')
+
+#----------------------------------------------------------------------------#
+# Validation.
+#----------------------------------------------------------------------------#
+# Rows are checked with the same validators the WTForms forms use. Each
+# clean_* function returns the column values or raises ValueError.
+
+def parse_row(row):
+    # A row dict, or one NDJSON line to decode into one
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise ValueError(f'invalid JSON: {e}')
+    if not isinstance(row, dict):
+        raise ValueError(f'expected an object, got {type(row).__name__}')
+    return row
+
+class ImportField:
+    '''Minimal stand-in for a WTForms field so the forms.py validators can check raw values.'''
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def gettext(self, string):
+        return string
+
+def check(name, value, *validators):
+    field = ImportField(name, value)
+    for validator in validators:
+        try:
+            validator(None, field)
+        except ValidationError as e:
+            raise ValueError(f'{name} {e}')
+    return value
+
+def required(row, *names):
+    values = {}
+    for name in names:
+        value = row.get(name)
+        if value is None or str(value).strip() == '':
+            raise ValueError(f'{name} is required')
+        values[name] = str(value).strip()
+    return values
+
+def optional(row, *names):
+    return {name: (str(row[name]).strip() or None) if row.get(name) is not None else None
+            for name in names}
+
+def boolean(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+def genre_list(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    genres = modify_genres(value or [])
+    if not genres:
+        raise ValueError('genres is required')
+    return genres
+
+def clean_venue(row):
+    venue = required(row, 'name', 'city', 'state', 'address', 'facebook_link')
+    venue.update(optional(row, 'phone', 'image_link', 'website_link', 'seeking_description'))
+    if venue['state'] not in STATES:
+        raise ValueError('state is not a valid choice')
+    if venue['phone']:
+        check('phone', venue['phone'], validate_phone)
+    check('facebook_link', venue['facebook_link'], URL())
+    venue['seeking_talent'] = boolean(row.get('seeking_talent', False))
+    venue['genres'] = genre_list(row.get('genres'))
+    return venue
+
+def clean_artist(row):
+    artist = required(row, 'name', 'city', 'state', 'phone', 'facebook_link')
+    artist.update(optional(row, 'image_link', 'website_link', 'seeking_description'))
+    if artist['state'] not in STATES:
+        raise ValueError('state is not a valid choice')
+    check('phone', artist['phone'], validate_phone)
+    check('facebook_link', artist['facebook_link'], URL())
+    artist['seeking_venue'] = boolean(row.get('seeking_venue', False))
+    artist['genres'] = genre_list(row.get('genres'))
+    return artist
+
+def clean_show(row):
+    show = required(row, 'venue_id', 'artist_id', 'start_time')
+    check('venue_id', show['venue_id'], validate_ID)
+    check('artist_id', show['artist_id'], validate_ID)
+    try:
+        start_time = dateutil.parser.parse(show['start_time'])
+    except (ValueError, OverflowError):
+        raise ValueError('start_time is not a valid date')
+    return {
+        'venue_id': int(show['venue_id']),
+        'artist_id': int(show['artist_id']),
+        'start_time': start_time,
+    }
+
+#----------------------------------------------------------------------------#
+# Writing.
+#----------------------------------------------------------------------------#
+# Each insert_* function writes one batch of cleaned (line number, values)
+# pairs in a single transaction and returns the rows it had to reject.
+
+def insert_with_genres(model, batch):
+    # One lookup for every genre named in the batch, new genres are created once
+    genre_names = {name for _, values in batch for name in values['genres']}
+    genres = {genre.name: genre for genre in Genre.query.filter(Genre.name.in_(genre_names))}
+    for name in genre_names - genres.keys():
+        genres[name] = Genre(name=name)
+
+    # The ORM flushes same-table INSERTs as a batch (execute_values with RETURNING
+    # on psycopg2) and the association rows as one executemany
+    records = []
+    for _, values in batch:
+        record = model(**{**values, 'genres': [genres[name] for name in values['genres']]})
+        records.append(record)
+    db.session.add_all(records)
+    return []
+
+def insert_venues(batch):
+    return insert_with_genres(Venue, batch)
+
+def insert_artists(batch):
+    return insert_with_genres(Artist, batch)
+
+def insert_shows(batch):
+    # Resolve both foreign keys with one set based lookup each for the whole batch
+    venue_ids = {values['venue_id'] for _, values in batch}
+    artist_ids = {values['artist_id'] for _, values in batch}
+    known_venues = {venue_id for (venue_id,) in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+    known_artists = {artist_id for (artist_id,) in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+
+    rejected, rows = [], []
+    for line_number, values in batch:
+        if values['venue_id'] not in known_venues:
+            rejected.append((line_number, f"venue_id {values['venue_id']} does not exist"))
+        elif values['artist_id'] not in known_artists:
+            rejected.append((line_number, f"artist_id {values['artist_id']} does not exist"))
+        else:
+            rows.append(values)
+    if rows:
+        # Core insert with a list of parameters runs as a single executemany
+        db.session.execute(Show.__table__.insert(), rows)
+    return rejected
+
+IMPORTERS = {
+    'venues': (clean_venue, insert_venues),
+    'artists': (clean_artist, insert_artists),
+    'shows': (clean_show, insert_shows),
+}
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+def import_rows(kind, rows, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    '''
+    Validates and inserts (line number, row) pairs of the given kind
+    ('venues', 'artists' or 'shows') in batches of batch_size, committing
+    once per batch. Returns an ImportReport.
+    '''
+    clean, insert = IMPORTERS[kind]
+    report = ImportReport()
+
+    def flush(batch):
+        try:
+            rejected = insert(batch)
+            db.session.commit()
+            report.imported += len(batch) - len(rejected)
+            report.rejected.extend(rejected)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            report.rejected.extend((line_number, f'batch failed: {e.__class__.__name__}')
+                                   for line_number, _ in batch)
+        if on_batch:
+            on_batch(report)
+
+    batch = []
+    for line_number, row in rows:
+        try:
+            batch.append((line_number, clean(parse_row(row))))
+        except ValueError as e:
+            report.rejected.append((line_number, str(e)))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
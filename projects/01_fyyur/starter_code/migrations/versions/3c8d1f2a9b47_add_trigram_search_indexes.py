@@ -0,0 +1,44 @@
+"""add trigram search indexes
+
+Revision ID: 3c8d1f2a9b47
+Revises: 5716ecab2edc
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8d1f2a9b47'
+down_revision = '5716ecab2edc'
+branch_labels = None
+depends_on = None
+
+# GIN trigram indexes serve the ILIKE '%term%' and similarity() ranking in search.py
+TRIGRAM_INDEXES = [
+    ('ix_venue_name_trgm', 'Venue', 'name'),
+    ('ix_venue_city_trgm', 'Venue', 'city'),
+    ('ix_venue_genres_trgm', 'Venue', 'genres'),
+    ('ix_artist_name_trgm', 'Artist', 'name'),
+    ('ix_artist_city_trgm', 'Artist', 'city'),
+    ('ix_artist_genres_trgm', 'Artist', 'genres'),
+]
+
+
+def upgrade():
+    # pg_trgm is PostgreSQL only - other databases fall back to the in-memory index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, table, column in TRIGRAM_INDEXES:
+        op.create_index(index_name, table, [column],
+                        postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for index_name, table, column in TRIGRAM_INDEXES:
+        op.drop_index(index_name, table_name=table)
@@ -0,0 +1,94 @@
+"""normalize genres into lookup table
+
+Revision ID: 8e5a7c4d2f10
+Revises: 3c8d1f2a9b47
+Create Date: 2026-10-17 11:02:17.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e5a7c4d2f10'
+down_revision = '3c8d1f2a9b47'
+branch_labels = None
+depends_on = None
+
+# (owner table, association table, association foreign key column)
+GENRE_OWNERS = [
+    ('Venue', 'venue_genres', 'venue_id'),
+    ('Artist', 'artist_genres', 'artist_id'),
+]
+
+
+def upgrade():
+    genre_table = op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for owner, association, owner_column in GENRE_OWNERS:
+        op.create_table(association,
+        sa.Column(owner_column, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([owner_column], [f'{owner}.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(owner_column, 'genre_id')
+        )
+        op.create_index(op.f(f'ix_{association}_genre_id'), association, ['genre_id'], unique=False)
+
+    # Convert the comma-joined genre strings ("Jazz, Reggae") into rows
+    connection = op.get_bind()
+    owner_genres = {}
+    for owner, association, owner_column in GENRE_OWNERS:
+        rows = connection.execute(sa.text(f'SELECT id, genres FROM "{owner}"')).fetchall()
+        owner_genres[owner] = [
+            (owner_id, name.strip())
+            for owner_id, genres in rows
+            for name in (genres or '').split(',') if name.strip()
+        ]
+
+    genre_names = sorted({name for pairs in owner_genres.values() for _, name in pairs})
+    if genre_names:
+        op.bulk_insert(genre_table, [{'name': name} for name in genre_names])
+    genre_ids = dict((name, genre_id) for genre_id, name in
+                     connection.execute(sa.text('SELECT id, name FROM "Genre"')))
+
+    for owner, association, owner_column in GENRE_OWNERS:
+        association_table = sa.table(association, sa.column(owner_column), sa.column('genre_id'))
+        links = {(owner_id, genre_ids[name]) for owner_id, name in owner_genres[owner]}
+        if links:
+            op.bulk_insert(association_table, [
+                {owner_column: owner_id, 'genre_id': genre_id} for owner_id, genre_id in sorted(links)])
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    connection = op.get_bind()
+    for owner, association, owner_column in GENRE_OWNERS:
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.add_column(sa.Column('genres', sa.String(length=120), nullable=True))
+
+        genres = {}
+        for owner_id, name in connection.execute(sa.text(
+                f'SELECT a.{owner_column}, g.name FROM {association} a '
+                f'JOIN "Genre" g ON g.id = a.genre_id ORDER BY g.name')):
+            genres.setdefault(owner_id, []).append(name)
+        for owner_id, names in genres.items():
+            connection.execute(sa.text(f'UPDATE "{owner}" SET genres = :genres WHERE id = :id'),
+                               {'genres': ', '.join(names), 'id': owner_id})
+        connection.execute(sa.text(f'UPDATE "{owner}" SET genres = \'\' WHERE genres IS NULL'))
+
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.alter_column('genres', existing_type=sa.String(length=120), nullable=False)
+        if connection.dialect.name == 'postgresql':
+            op.create_index(f'ix_{owner.lower()}_genres_trgm', owner, ['genres'],
+                            postgresql_using='gin',
+                            postgresql_ops={'genres': 'gin_trgm_ops'})
+
+        op.drop_index(op.f(f'ix_{association}_genre_id'), table_name=association)
+        op.drop_table(association)
+    op.drop_table('Genre')
@@ -0,0 +1,33 @@
+"""add genre name trigram index
+
+Revision ID: d4e9a1c7b352
+Revises: b71f0d3e6a25
+Create Date: 2026-10-17 14:05:12.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e9a1c7b352'
+down_revision = 'b71f0d3e6a25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replaces the Venue/Artist genres trigram indexes dropped with the genres
+    # columns: search.py matches genres through Genre.name
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_genre_name_trgm', 'Genre', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_genre_name_trgm', table_name='Genre')
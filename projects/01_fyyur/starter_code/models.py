@@ -1,20 +1,72 @@
 #----------------------------------------------------------------------------#
 # Imports.
 #----------------------------------------------------------------------------#
-from flask_sqlalchemy import SQLAlchemy
+from flask import g, request, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
 from datetime import datetime
 
 #----------------------------------------------------------------------------#
 # Config.
 #----------------------------------------------------------------------------#
-db = SQLAlchemy()
+
+class RoutingSession(SignallingSession):
+    '''
+    Sends the reads of GET/HEAD requests to the 'replica' bind when
+    DATABASE_REPLICA_URL is configured. Flushes, every other request and
+    pages rendered to be stored in the page cache (g.read_from_primary, see
+    cache.py) keep using the primary database.
+    '''
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        binds = self.app.config.get('SQLALCHEMY_BINDS') or {}
+        if ('replica' in binds and not self._flushing
+                and has_request_context() and request.method in ('GET', 'HEAD')
+                and not g.get('read_from_primary')):
+            return self.db.get_engine(self.app, bind='replica')
+        return super().get_bind(mapper, clause)
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+db = RoutingSQLAlchemy()
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# Genres are stored once in the Genre lookup table and linked through these
+# association tables. The (genre_id) indexes serve "all venues/artists in genre X"
+venue_genres = db.Table('venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True, index=True)
+)
+
+artist_genres = db.Table('artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True, index=True)
+)
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+      return f'<Genre ID: {self.id}, Name: {self.name}>'
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    # /venues groups and orders by area, ?state= filters on it
+    __table_args__ = (
+        db.Index('ix_venue_state_city', 'state', 'city', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -25,11 +77,15 @@ class Venue(db.Model):
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120), nullable=False) # Must be valid url
     website_link = db.Column(db.String(500))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genres, order_by='Genre.name', lazy='selectin')
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
     shows = db.relationship('Show', backref='venue', cascade='all, delete', lazy=True)
 
+    @property
+    def genre_names(self):
+      return [genre.name for genre in self.genres]
+
     def __repr__(self):
       return f'<Venue ID: {self.id}, Name: {self.name}, City: {self.city}, Phone: {self.phone}>'
 
@@ -40,20 +96,28 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    # /artists?state= filter
+    __table_args__ = (
+        db.Index('ix_artist_state', 'state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False) # Validation logic to do in forms.py and here?
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genres, order_by='Genre.name', lazy='selectin')
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120), nullable=False) # valid URL
     website_link = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
     shows = db.relationship('Show', backref='artist', cascade='all, delete', lazy=True)
-  
+
+    @property
+    def genre_names(self):
+      return [genre.name for genre in self.genres]
+
     def __repr__(self):
       return f'<Artist ID: {self.id}, Name: {self.name}, Phone: {self.phone}, Seeking: {self.seeking_venue}>'
 
@@ -63,6 +127,13 @@ class Artist(db.Model):
 
 class Show(db.Model):
   __tablename__ = 'Show'
+  # Detail pages and the /venues upcoming counts look shows up by venue/artist and start_time,
+  # /shows pages through them by (start_time, id)
+  __table_args__ = (
+    db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_show_start_time_id', 'start_time', 'id'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
@@ -0,0 +1,163 @@
+#----------------------------------------------------------------------------#
+# Imports.
+#----------------------------------------------------------------------------#
+import re
+from collections import defaultdict
+
+from sqlalchemy import DDL, event
+
+from models import db, Venue, Artist, Genre, venue_genres, artist_genres
+
+#----------------------------------------------------------------------------#
+# Config.
+#----------------------------------------------------------------------------#
+SEARCH_RESULT_LIMIT = 20
+
+# Columns matched against the search term for each model, genre names are matched too
+SEARCH_FIELDS = {
+    Venue: ('name', 'city'),
+    Artist: ('name', 'city'),
+}
+
+# Association table column linking each model to its genres
+GENRE_LINKS = {
+    Venue: venue_genres.c.venue_id,
+    Artist: artist_genres.c.artist_id,
+}
+
+# GIN trigram indexes behind the ILIKE '%term%' arms and similarity() ranking on
+# PostgreSQL. The migrations create them; these DDL events do the same for
+# db.create_all() (bench.py, tests)
+TRIGRAM_INDEXES = [
+    (Venue, 'ix_venue_name_trgm', 'name'),
+    (Venue, 'ix_venue_city_trgm', 'city'),
+    (Artist, 'ix_artist_name_trgm', 'name'),
+    (Artist, 'ix_artist_city_trgm', 'city'),
+    (Genre, 'ix_genre_name_trgm', 'name'),
+]
+
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+for _model, _index_name, _column in TRIGRAM_INDEXES:
+    event.listen(_model.__table__, 'after_create', DDL(
+        f'CREATE INDEX IF NOT EXISTS {_index_name} ON "{_model.__tablename__}" '
+        f'USING gin ({_column} gin_trgm_ops)').execute_if(dialect='postgresql'))
+
+#----------------------------------------------------------------------------#
+# Trigrams.
+#----------------------------------------------------------------------------#
+# Mirrors pg_trgm: lower-cased words padded with two leading and one trailing
+# space, so rankings agree between PostgreSQL and the in-memory fallback.
+
+def trigrams(text):
+    grams = set()
+    for word in re.findall(r'[a-z0-9]+', (text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(grams_a, grams_b):
+    if not grams_a or not grams_b:
+        return 0.0
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+#----------------------------------------------------------------------------#
+# In-memory index (used when the database is not PostgreSQL, e.g. SQLite).
+#----------------------------------------------------------------------------#
+
+class NgramIndex:
+    def __init__(self):
+        self.documents = {}
+        self.postings = defaultdict(set)
+
+    def add(self, doc_id, fields):
+        texts = [(field or '').lower() for field in fields]
+        self.documents[doc_id] = [(text, trigrams(text)) for text in texts]
+        # Raw (unpadded) 3-grams of the whole text narrow down substring candidates
+        for text in texts:
+            for i in range(len(text) - 2):
+                self.postings[text[i:i + 3]].add(doc_id)
+
+    def search(self, term, limit=SEARCH_RESULT_LIMIT):
+        # Returns (total number of matches, best ranked document ids up to limit)
+        term = term.lower().strip()
+        term_grams = [term[i:i + 3] for i in range(len(term) - 2)]
+        if term_grams:
+            posting_lists = sorted((self.postings.get(gram, set()) for gram in term_grams), key=len)
+            candidates = set.intersection(*posting_lists)
+        else:
+            candidates = self.documents.keys()
+
+        term_trigrams = trigrams(term)
+        ranked = []
+        for doc_id in candidates:
+            fields = self.documents[doc_id]
+            if any(term in text for text, _ in fields):
+                rank = max(similarity(term_trigrams, grams) for _, grams in fields)
+                ranked.append((-rank, doc_id))
+        ranked.sort()
+        return len(ranked), [doc_id for _, doc_id in ranked[:limit]]
+
+
+_indexes = {}
+
+def invalidate_search_index(model=None):
+    # Drop the in-memory index for a model (or all of them), rebuilt on next search
+    if model is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(model, None)
+
+def get_search_index(model):
+    if model not in _indexes:
+        columns = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+        link = GENRE_LINKS[model]
+        genres = defaultdict(list)
+        for doc_id, genre_name in db.session.query(link, Genre.name).join(
+                Genre, Genre.id == link.table.c.genre_id):
+            genres[doc_id].append(genre_name)
+
+        index = NgramIndex()
+        for row in db.session.query(model.id, *columns):
+            index.add(row[0], (*row[1:], ', '.join(genres[row[0]])))
+        _indexes[model] = index
+    return _indexes[model]
+
+for _model in SEARCH_FIELDS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, lambda mapper, connection, target: invalidate_search_index(type(target)))
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+def search(model, term, limit=SEARCH_RESULT_LIMIT):
+    '''
+    Case-insensitive partial match of term against the model's name, city and genres.
+    Returns (total number of matches, up to limit records ranked by trigram similarity).
+    PostgreSQL answers this from the pg_trgm GIN indexes; anything else uses NgramIndex.
+    '''
+    term = (term or '').strip()
+    columns = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+
+    if db.engine.dialect.name == 'postgresql':
+        pattern = f'%{term}%'
+        # Candidates as a UNION of index backed selects: an OR with the genre
+        # EXISTS subplan cannot be a BitmapOr and falls back to a seq scan
+        link = GENRE_LINKS[model]
+        candidates = db.union(
+            *[db.select([model.id]).where(column.ilike(pattern)) for column in columns],
+            db.select([link]).select_from(
+                link.table.join(Genre, Genre.id == link.table.c.genre_id)
+            ).where(Genre.name.ilike(pattern)))
+        rank = db.func.greatest(*[db.func.similarity(column, term) for column in columns])
+        rows = db.session.query(model, db.func.count().over()).filter(
+            model.id.in_(candidates)
+        ).order_by(rank.desc(), model.id).limit(limit).all()
+        total = rows[0][1] if rows else 0
+        return total, [record for record, _ in rows]
+
+    total, ids = get_search_index(model).search(term, limit)
+    records = {record.id: record for record in model.query.filter(model.id.in_(ids))} if ids else {}
+    return total, [records[doc_id] for doc_id in ids if doc_id in records]
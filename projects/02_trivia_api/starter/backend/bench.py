@@ -0,0 +1,379 @@
+# Benchmarks and load tests for the trivia API.
+#
+# Seeds a synthetic question corpus into a throwaway database, then:
+#   - times search against the old unindexed ILIKE and checks that category
+#     pages use the (category, id) index
+#   - load tests /questions, /questions/search, /categories/<id>/questions
+#     and /quizzes, through the Flask test client or (--server) a real WSGI
+#     server with --concurrency client threads, reporting p50/p95/p99
+#     latency, throughput and SQL queries per request
+#   - saves those numbers as baselines (--save-baseline) and compares later
+#     runs against them (--compare), failing on regressions
+#
+# Uses a SQLite file in the temp directory unless BENCH_DATABASE_URL points
+# at an empty PostgreSQL database (its tables are dropped). A corpus of the
+# same size is reused between runs.
+#
+#   python bench.py --questions 100000
+#   python bench.py --questions 100000 --server --concurrency 8 --compare
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, func
+from werkzeug.serving import make_server
+
+from flaskr import create_app
+from models import db, Question, Category
+
+DATABASE_URL = os.environ.get(
+  'BENCH_DATABASE_URL',
+  'sqlite:///' + os.path.join(tempfile.gettempdir(), 'trivia_bench.db'))
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'bench_baselines.csv')
+BASELINE_FIELDS = ['questions', 'mode', 'endpoint', 'p50_ms', 'p95_ms',
+                   'p99_ms', 'requests_per_second', 'queries_per_request']
+# A run regresses when its p95 is this much slower than the baseline, or
+# when it issues this many more queries per request
+REGRESSION_TOLERANCE = 0.25
+QUERY_TOLERANCE = 0.1
+
+WORDS = ('apple banana cherry delta echo falcon galaxy harbor island jungle '
+         'kettle lemon meadow nickel orbit pepper quartz river saturn tiger '
+         'umbrella violet walnut xenon yellow zephyr anchor bridge canyon '
+         'desert ember forest glacier horizon').split()
+
+SEARCH_TERMS = ('title', 'galaxy', 'riv', 'saturn orbit', 'zzz')
+
+CATEGORIES = ('Science', 'Art', 'Geography', 'History', 'Entertainment',
+              'Sports')
+
+
+def seed_questions(num_questions, batch_size=10000):
+    # Reuse a corpus of the same size left by a previous run
+    if db.engine.has_table('questions') and db.session.query(
+            func.count(Question.id)).scalar() == num_questions:
+        return False
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Category.__table__.insert(),
+                       [{'type': type} for type in CATEGORIES])
+    rng = random.Random(42)
+    for start in range(0, num_questions, batch_size):
+        db.session.execute(Question.__table__.insert(), [{
+            'question': ' '.join(rng.choice(WORDS) for _ in range(8)) + (
+              ' title' if n % 1000 == 0 else ''),
+            'answer': ' '.join(rng.choice(WORDS) for _ in range(2)),
+            'category': n % 6 + 1,
+            'difficulty': n % 5 + 1,
+        } for n in range(start, min(start + batch_size, num_questions))])
+        db.session.commit()
+    return True
+
+
+class QueryCounter:
+    # Counts the SQL statements the engine runs, from any thread
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _count(self, *args):
+        with self.lock:
+            self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def timed(f, repeat=5):
+    # Best of repeat runs, in milliseconds
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile of an already sorted list
+    index = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[index]
+
+#
+# Micro benchmarks
+#
+
+
+def bench_search(client, num_questions):
+    print(f'POST /questions/search, {num_questions} questions')
+    for term in SEARCH_TERMS:
+        # The previous implementation: unindexed ILIKE, every match loaded
+        ilike_ms, matches = timed(lambda: Question.query.filter(
+          Question.question.ilike(f'%{term}%')).all(), repeat=1)
+        search_ms, response = timed(lambda: client.post(
+          '/questions/search', json={'searchTerm': term}))
+        assert response.status_code == 200
+        total = response.get_json()['total_questions']
+        print(f'  {term!r:<15} ilike {ilike_ms:8.1f} ms '
+              f'({len(matches):>6} rows)   full-text {search_ms:6.1f} ms '
+              f'({total} matches)')
+
+
+def query_plan(query):
+    # The database's plan for a Query, one line per step
+    statement = query.statement.compile(db.engine,
+                                        compile_kwargs={'literal_binds': True})
+    if db.engine.dialect.name == 'postgresql':
+        rows = db.session.execute(f'EXPLAIN {statement}')
+        return [row[0] for row in rows]
+    rows = db.session.execute(f'EXPLAIN QUERY PLAN {statement}')
+    return [row[-1] for row in rows]
+
+
+def bench_category(client, num_questions):
+    print(f'GET /categories/<id>/questions, {num_questions} questions')
+    db.session.execute('ANALYZE')
+    plan = query_plan(Question.query.filter(Question.category == 3).order_by(
+      Question.id).limit(10))
+    print('  plan: ' + ' / '.join(line.strip() for line in plan))
+    assert any('ix_questions_category_id' in line for line in plan), \
+        'category filter does not use ix_questions_category_id'
+    for url in ('/categories/3/questions', '/categories/3/questions?page=50',
+                f'/categories/3/questions?after={num_questions // 2}'):
+        elapsed_ms, response = timed(lambda: client.get(url))
+        assert response.status_code == 200
+        print(f'  {url:<40} {elapsed_ms:6.1f} ms')
+
+#
+# Load test
+#
+
+
+def endpoint_requests(num_questions):
+    # Request factories per endpoint: (method, url, json body)
+    pages = max(num_questions // 10, 1)
+
+    def questions(rng):
+        if rng.random() < 0.5:
+            page = rng.randint(1, min(pages, 100))
+            return 'GET', f'/questions?page={page}', None
+        after = rng.randint(0, max(num_questions - 10, 0))
+        return 'GET', f'/questions?after={after}', None
+
+    def search(rng):
+        term = ' '.join(rng.sample(WORDS, rng.randint(1, 2)))
+        return 'POST', '/questions/search', {'searchTerm': term}
+
+    def category(rng):
+        return 'GET', f'/categories/{rng.randint(1, 6)}/questions?page=' \
+            f'{rng.randint(1, 20)}', None
+
+    def quizzes(rng):
+        previous = [rng.randint(1, num_questions)
+                    for _ in range(rng.randint(0, 20))]
+        return 'POST', '/quizzes', {
+            'previous_questions': previous,
+            'quiz_category': {'type': 'any', 'id': rng.randint(0, 6)}
+        }
+
+    return {
+        'GET /questions': questions,
+        'POST /questions/search': search,
+        'GET /categories/<id>/questions': category,
+        'POST /quizzes': quizzes,
+    }
+
+
+def client_sender(app):
+    client = app.test_client()
+
+    def send(method, url, body):
+        response = client.open(url, method=method, json=body)
+        assert response.status_code == 200, (url, response.status_code)
+    return send
+
+
+def http_sender(base_url):
+    def send(method, url, body):
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(
+          base_url + url, data=data, method=method,
+          headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            assert response.status == 200, (url, response.status)
+    return send
+
+
+def run_load(send, make_request, num_requests, concurrency):
+    rng = random.Random(7)
+    planned = [make_request(rng) for _ in range(num_requests)]
+    latencies = []
+
+    def one(request):
+        start = time.perf_counter()
+        send(*request)
+        return (time.perf_counter() - start) * 1000
+
+    with QueryCounter(db.engine) as counter:
+        start = time.perf_counter()
+        if concurrency == 1:
+            latencies = [one(request) for request in planned]
+        else:
+            with ThreadPoolExecutor(concurrency) as pool:
+                latencies = list(pool.map(one, planned))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'requests_per_second': num_requests / elapsed,
+        'queries_per_request': counter.count / num_requests,
+    }
+
+
+def bench_load(app, num_questions, num_requests, concurrency, server):
+    mode = f'server-c{concurrency}' if server else 'client'
+    print(f'Load test ({mode}), {num_questions} questions, '
+          f'{num_requests} requests per endpoint')
+    print(f'  {"endpoint":<32} {"p50":>8} {"p95":>8} {"p99":>8} '
+          f'{"req/s":>8} {"queries":>8}')
+
+    httpd = None
+    if server:
+        # Keep the per-request access log out of the report
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        httpd = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        send = http_sender(f'http://127.0.0.1:{httpd.server_port}')
+    else:
+        send = client_sender(app)
+        concurrency = 1
+
+    results = []
+    try:
+        for endpoint, make_request in endpoint_requests(num_questions).items():
+            stats = run_load(send, make_request, num_requests, concurrency)
+            print(f'  {endpoint:<32} {stats["p50_ms"]:8.2f} '
+                  f'{stats["p95_ms"]:8.2f} {stats["p99_ms"]:8.2f} '
+                  f'{stats["requests_per_second"]:8.1f} '
+                  f'{stats["queries_per_request"]:8.2f}')
+            results.append(dict(stats, questions=num_questions, mode=mode,
+                                endpoint=endpoint))
+    finally:
+        if httpd:
+            httpd.shutdown()
+    return results
+
+#
+# Baselines
+#
+
+
+def baseline_key(row):
+    return int(row['questions']), row['mode'], row['endpoint']
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES, newline='') as baseline_file:
+        return {baseline_key(row): row
+                for row in csv.DictReader(baseline_file)}
+
+
+def save_baselines(results):
+    baselines = load_baselines()
+    for result in results:
+        baselines[baseline_key(result)] = {
+            name: (f'{value:.3f}' if isinstance(value, float) else value)
+            for name, value in result.items()}
+    with open(BASELINES, 'w', newline='') as baseline_file:
+        writer = csv.DictWriter(baseline_file, BASELINE_FIELDS)
+        writer.writeheader()
+        for key in sorted(baselines):
+            writer.writerow(baselines[key])
+    print(f'Saved {len(results)} baselines to {os.path.basename(BASELINES)}')
+
+
+def compare_baselines(results):
+    # Returns the endpoints whose p95 regressed beyond REGRESSION_TOLERANCE
+    baselines = load_baselines()
+    regressions = []
+    print('Compared to baseline (p95, queries per request)')
+    for result in results:
+        baseline = baselines.get(baseline_key(result))
+        if baseline is None:
+            print(f'  {result["endpoint"]:<32} no baseline')
+            continue
+        before, after = float(baseline['p95_ms']), result['p95_ms']
+        change = (after - before) / before if before else 0.0
+        queries = float(baseline['queries_per_request'])
+        regressed = change > REGRESSION_TOLERANCE or \
+            result['queries_per_request'] > queries + QUERY_TOLERANCE
+        print(f'  {result["endpoint"]:<32} {before:8.2f} -> {after:8.2f} ms '
+              f'({change:+.0%}), {queries:.2f} -> '
+              f'{result["queries_per_request"]:.2f} queries'
+              f'{"  REGRESSION" if regressed else ""}')
+        if regressed:
+            regressions.append(result['endpoint'])
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=10000,
+                        help='corpus size, 10k to 1M (default 10000)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per endpoint in the load test')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='client threads in --server mode')
+    parser.add_argument('--server', action='store_true',
+                        help='load test a real WSGI server over HTTP')
+    parser.add_argument('--skip-micro', action='store_true',
+                        help='only run the load test')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true',
+                        help='exit 1 when slower than the saved baseline')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': DATABASE_URL})
+    with app.app_context():
+        start = time.perf_counter()
+        if seed_questions(args.questions):
+            print(f'Seeded {args.questions} questions in '
+                  f'{time.perf_counter() - start:.1f} s')
+        # The category map was loaded before seeding
+        app.category_cache.invalidate()
+        if not args.skip_micro:
+            bench_search(app.test_client(), args.questions)
+            bench_category(app.test_client(), args.questions)
+
+        results = bench_load(app, args.questions, args.requests,
+                             args.concurrency, args.server)
+    if args.save_baseline:
+        save_baselines(results)
+    if args.compare and compare_baselines(results):
+        sys.exit(1)
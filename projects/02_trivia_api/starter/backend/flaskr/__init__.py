@@ -1,34 +1,72 @@
 import os
-from flask import Flask, request, abort, jsonify
+from flask import Flask, Response, request, abort, jsonify, \
+    stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
-from models import setup_db, Question, Category
+from models import setup_db, database_path, db, Question
+from .pagination import paginate, count_rows
+from .quiz_sessions import create_session_store
+from .categories import CategoryCache, CATEGORY_CACHE_TTL
+from .search import search_selection
+from .bulk import import_questions, export_questions
+from .counters import QuestionCounter, wants_minimal
 
 QUESTIONS_PER_PAGE = 10
 
 
 # Paginate questions and organise into desired format
-def paginate_questions(request, selection):
-    items_limit = request.args.get('limit', QUESTIONS_PER_PAGE, type=int)
-    selected_page = request.args.get('page', 1, type=int)
-    current_index = selected_page - 1
-
-    questions = Question.query.order_by(Question.id
-                                        ).limit(items_limit).offset(
-                                          current_index * items_limit).all()
-
-    current_questions = [question.format() for question in questions]
-
-    return current_questions
+def paginate_questions(request, selection, rank=None):
+    # selection is a Question query carrying any filters, paged in the database
+    page = paginate(request, selection, Question.id, QUESTIONS_PER_PAGE, rank)
+    return {
+        'questions': [question.format() for question in page.items],
+        'total_questions': page.total,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    }
+
+
+# Pick one random question of a selection, the others are never loaded
+def random_question(selection):
+    total = count_rows(selection, Question.id)
+    if not total:
+        return None
+    # Random offset over the COUNT, walked along the primary key index
+    return selection.order_by(Question.id).offset(
+      random.randrange(total)).first()
 
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
-    setup_db(app)
+    app.config['QUIZ_SESSION_REDIS_URL'] = os.environ.get(
+      'QUIZ_SESSION_REDIS_URL')
+    if test_config:
+        app.config.update(test_config)
+    setup_db(app, app.config.get('SQLALCHEMY_DATABASE_URI') or database_path)
     CORS(app, resources={r"/api/*": {"origins": '*'}})
+    quiz_sessions = create_session_store(app.config)
+
+    # Load the category map up front, every request then reads it from memory
+    category_cache = CategoryCache(
+      app.config.get('CATEGORY_CACHE_TTL', CATEGORY_CACHE_TTL))
+    with app.app_context():
+        category_cache.load()
+    app.category_cache = category_cache
+    question_counter = QuestionCounter()
+    app.question_counter = question_counter
+
+    def minimal_response(**fields):
+        # Just the written id and the running total, no page is loaded
+        response = jsonify({
+            'success': True,
+            **fields,
+            'total_questions': question_counter.get()
+        })
+        response.headers['Preference-Applied'] = 'return=minimal'
+        return response
 
     @app.after_request
     def after_request(response):
@@ -40,40 +78,38 @@ def create_app(test_config=None):
 
     @app.route('/categories', methods=['GET'])
     def retrieve_all_categories():
-        # Get all categories, if none found, abort 404,
-        # else format and return json object
-        categories = Category.query.order_by(Category.id).all()
+        # Get all categories from the cache, if none found, abort 404,
+        # else return json object. Clients resending the ETag get a 304
+        categories = category_cache.get()
 
         if not categories:
             abort(404)
 
-        formatted_categories = {category.id: category.type
-                                for category in categories}
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'categories': formatted_categories,
-            'total_categories': len(formatted_categories)
+            'categories': categories,
+            'total_categories': len(categories)
         })
+        response.set_etag(category_cache.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
     @app.route('/questions', methods=['GET'])
     def retrieve_paginated_questions():
-        # Get and paginate questions, get categories
-        selection = Question.query.order_by(Question.id).all()
-        current_questions = paginate_questions(request, selection)
+        # Get a page of questions, get categories
+        page = paginate_questions(request, Question.query)
 
-        categories = Category.query.order_by(Category.id).all()
+        categories = category_cache.get()
 
         # Abort 404 if no questions or no categories
-        if len(current_questions) == 0 or not categories:
+        if len(page['questions']) == 0 or not categories:
             abort(404)
 
         #  return intented json object
         return jsonify({
             'success': True,
-            'questions': current_questions,
-            'total_questions': len(selection),
-            'categories': {category.id: category.type
-                           for category in categories},
+            **page,
+            'categories': categories,
             'current_categories': None
         })
 
@@ -84,16 +120,18 @@ def create_app(test_config=None):
             # If it exist, delete
             question = Question.query.get_or_404(question_id)
             question.delete()
+            question_counter.add(-1)
+
+            if wants_minimal(request):
+                return minimal_response(deleted=question_id)
 
             # Repaginate and display questions
-            selection = Question.query.order_by(Question.id).all()
-            current_questions = paginate_questions(request, selection)
+            page = paginate_questions(request, Question.query)
 
             return jsonify({
               'success': True,
               'deleted': question_id,
-              'questions': current_questions,
-              'total_questions': len(selection)
+              **page
             })
         except ValueError as e:
             print(f'Error: {str(e)}')
@@ -119,58 +157,84 @@ def create_app(test_config=None):
             )
 
             question.insert()
+            question_counter.add(1)
+
+            if wants_minimal(request):
+                return minimal_response(created=question.id)
 
             # repaginate and display questions
-            selection = Question.query.order_by(Question.id).all()
-            current_questions = paginate_questions(request, selection)
+            page = paginate_questions(request, Question.query)
 
             return jsonify({
                 'success': True,
                 'created': question.id,
-                'questions': current_questions,
-                'total_questions': len(selection)
+                **page
             })
         except ValueError as e:
             print(f'Error: {str(e)}')
             abort(422)
 
+    @app.route('/questions/bulk', methods=['POST'])
+    def bulk_create_questions():
+        # Import NDJSON questions streamed in the request body, one per line.
+        # All or nothing: any invalid line rolls the whole import back
+        created, errors = import_questions(request.stream,
+                                           category_cache.get())
+        if errors:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': 422,
+                'message': 'unprocessable',
+                'errors': errors
+            }), 422
+        db.session.commit()
+        question_counter.add(created)
+
+        return jsonify({
+            'success': True,
+            'created': created
+        })
+
+    @app.route('/questions/export', methods=['GET'])
+    def export_all_questions():
+        # Stream every question as NDJSON, in constant memory
+        return Response(stream_with_context(export_questions()),
+                        mimetype='application/x-ndjson')
+
     @app.route('/questions/search', methods=['POST'])
     def search_questions():
         # Get search term from form
-        body = request.get_json()
+        body = request.get_json(silent=True) or {}
         search_term = body.get('searchTerm', None)
 
-        # search using the ilike to ensure case insensitivity
-        search_results = Question.query.filter(Question.question.ilike(
-                                                  f'%{search_term}%')).all()
-
-        if search_results is None:
-            abort(404)
-
-        formatted_search_results = [result.format()
-                                    for result in search_results]
+        # Full-text search over question and answer, best matches first,
+        # paged like /questions (?page, ?limit)
+        selection, rank = search_selection(search_term)
+        page = paginate_questions(request, selection, rank)
 
         return jsonify({
             'success': True,
-            'questions': formatted_search_results,
-            'total_questions': len(formatted_search_results)
+            **page
         })
 
     @app.route('/categories/<int:category_id>/questions', methods=['GET'])
     def retrieve_questions_by_category(category_id):
         try:
             # Get category based on id, filter questions
-            selected_category = Category.query.get_or_404(category_id)
+            categories = category_cache.get()
+            if category_id not in categories:
+                abort(404)
             category_questions = Question.query.filter(
-              Question.category == category_id).order_by(Question.id).all()
-            current_questions = paginate_questions(request, category_questions)
+              Question.category == category_id)
+            page = paginate_questions(request, category_questions)
 
             # Return intended json object
             return jsonify({
                 'success': True,
-                'questions': current_questions,
-                'total_questions': len(category_questions),
-                'current_category': selected_category.format()
+                **page,
+                'current_category': {'id': category_id,
+                                     'type': categories[category_id]}
             })
         except ValueError as e:
             print(f'Error: {str(e)}')
@@ -184,26 +248,21 @@ def create_app(test_config=None):
 
             previous_questions = body.get('previous_questions', None)
             quiz_category = body.get('quiz_category', None)
-
-            # Category id 0 - Select all questions not in previous questions!
-            if quiz_category['id'] == 0:
-                selected_questions = Question.query.filter(
-                  Question.id.notin_(previous_questions)).all()
-            # Select questions by category, make sure not in previous questions
-            else:
-                selected_questions = Question.query.filter(
-                  Question.category == quiz_category['id'],
-                  Question.id.notin_(previous_questions)).all()
-
-            # Format questions
-            questions = [question.format() for question in selected_questions]
-
-            # Choose a random question out of the ones selected
-            if selected_questions:
-                random_selector = random.randint(0, len(selected_questions)-1)
-                new_question = questions[random_selector]
-            else:
-                new_question = None
+            # The frontend sends category ids as strings
+            category_id = int(quiz_category['id'])
+
+            # Category id 0 - Select from all questions
+            selection = Question.query
+            if category_id != 0:
+                selection = selection.filter(Question.category == category_id)
+            # Make sure not in previous questions
+            if previous_questions:
+                selection = selection.filter(
+                  Question.id.notin_(previous_questions))
+
+            # Choose a random question, only that one is loaded and formatted
+            question = random_question(selection)
+            new_question = question.format() if question else None
 
             # Return question
             return jsonify({
@@ -214,6 +273,56 @@ def create_app(test_config=None):
             print(f'Error: {str(e)}')
             abort(422)
 
+    @app.route('/quizzes/sessions', methods=['POST'])
+    def create_quiz_session():
+        # Shuffle the category's question ids once, rounds then draw from
+        # the session instead of resending previous_questions
+        body = request.get_json(silent=True) or {}
+        quiz_category = body.get('quiz_category', None)
+        if not isinstance(quiz_category, dict) or 'id' not in quiz_category:
+            abort(400)
+        try:
+            # The frontend sends category ids as strings
+            category_id = int(quiz_category['id'])
+        except (TypeError, ValueError):
+            abort(400)
+
+        selection = db.session.query(Question.id)
+        if category_id != 0:
+            if category_id not in category_cache.get():
+                abort(404)
+            selection = selection.filter(Question.category == category_id)
+        question_ids = [question_id for (question_id,) in selection]
+        random.shuffle(question_ids)
+
+        return jsonify({
+            'success': True,
+            'session_id': quiz_sessions.create(question_ids),
+            'total_questions': len(question_ids)
+        })
+
+    @app.route('/quizzes/sessions/<session_id>/next', methods=['POST'])
+    def next_quiz_question(session_id):
+        # Draw the next question, 404 once the session expired or ended.
+        # Questions deleted since the session started are skipped
+        try:
+            while True:
+                question_id, remaining = quiz_sessions.draw(session_id)
+                if question_id is None:
+                    question = None
+                    break
+                question = Question.query.get(question_id)
+                if question:
+                    break
+        except KeyError:
+            abort(404)
+
+        return jsonify({
+            'success': True,
+            'question': question.format() if question else None,
+            'remaining_questions': remaining
+        })
+
     # Create all error handlers, pass in the error codes
     # return appropriate errors and messages
     @app.errorhandler(404)
@@ -0,0 +1,85 @@
+import json
+
+from models import db, Question
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+
+
+def clean_question(row, categories):
+    # Returns the column values of one imported question or raises ValueError
+    if not isinstance(row, dict):
+        raise ValueError('expected a JSON object')
+    values = {}
+    for name in ('question', 'answer'):
+        value = row.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'{name} is required')
+        values[name] = value.strip()
+    try:
+        category = int(row.get('category'))
+        difficulty = int(row.get('difficulty'))
+    except (TypeError, ValueError):
+        raise ValueError('category and difficulty must be integers')
+    if category not in categories:
+        raise ValueError(f'category {category} does not exist')
+    if not 1 <= difficulty <= 5:
+        raise ValueError('difficulty must be between 1 and 5')
+    values['category'] = category
+    values['difficulty'] = difficulty
+    return values
+
+
+def import_questions(lines, categories, batch_size=IMPORT_BATCH_SIZE):
+    '''
+    Validates NDJSON lines (bytes or str) and inserts them batch by batch
+    with one executemany each, in the caller's transaction. Returns
+    (number inserted, errors); once a line fails nothing more is inserted
+    and the caller should roll back, the rest is still validated.
+    '''
+    inserted, errors, batch = 0, [], []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(clean_question(json.loads(line), categories))
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({'line': line_number, 'error': str(e)})
+            continue
+        if len(batch) >= batch_size:
+            if not errors:
+                db.session.execute(Question.__table__.insert(), batch)
+                inserted += len(batch)
+            batch = []
+    if batch and not errors:
+        db.session.execute(Question.__table__.insert(), batch)
+        inserted += len(batch)
+    return inserted, errors
+
+
+def export_questions(batch_size=EXPORT_BATCH_SIZE):
+    '''
+    Yields every question as one NDJSON line, in id order. Rows come from a
+    server-side cursor (stream_results) in batches, so memory stays constant.
+    '''
+    questions = Question.__table__
+    result = db.session.execute(
+      questions.select().order_by(questions.c.id).execution_options(
+        stream_results=True))
+    try:
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield ''.join(json.dumps({
+                'id': row['id'],
+                'question': row['question'],
+                'answer': row['answer'],
+                'category': row['category'],
+                'difficulty': row['difficulty']
+            }) + '\n' for row in rows)
+    finally:
+        result.close()
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import threading
+import time
+
+from models import Category
+
+CATEGORY_CACHE_TTL = 300
+
+
+class CategoryCache:
+    '''
+    The id -> type map of every category, shared by the endpoints that need
+    it. Categories are effectively static, so the map is loaded once and
+    reloaded when it is older than ttl seconds or after invalidate().
+    '''
+
+    def __init__(self, ttl=CATEGORY_CACHE_TTL):
+        self.ttl = ttl
+        self.categories = None
+        self.etag = None
+        self.version = 0
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def load(self):
+        categories = {category.id: category.type
+                      for category in Category.query.order_by(Category.id)}
+        content = json.dumps(sorted(categories.items()))
+        with self.lock:
+            self.categories = categories
+            self.etag = hashlib.sha1(content.encode()).hexdigest()
+            self.version += 1
+            self.loaded_at = time.monotonic()
+        return categories
+
+    def get(self):
+        # An empty map is not cached, the categories may not be seeded yet
+        if not self.categories or \
+                time.monotonic() - self.loaded_at > self.ttl:
+            return self.load()
+        return self.categories
+
+    def invalidate(self):
+        # Call after changing the categories table, the next get() reloads
+        self.categories = None
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from sqlalchemy import func
+
+from models import db, Question
+
+QUESTION_COUNT_TTL = 60
+
+
+class QuestionCounter:
+    '''
+    Running total of questions for the minimal write responses. Counted once,
+    then adjusted by this process's creates and deletes; recounted after ttl
+    seconds to pick up writes made by other workers.
+    '''
+
+    def __init__(self, ttl=QUESTION_COUNT_TTL):
+        self.ttl = ttl
+        self.total = None
+        self.counted_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.total is None or \
+                    time.monotonic() - self.counted_at > self.ttl:
+                self.total = db.session.query(func.count(Question.id)).scalar()
+                self.counted_at = time.monotonic()
+            return self.total
+
+    def add(self, delta):
+        with self.lock:
+            if self.total is not None:
+                self.total += delta
+
+    def invalidate(self):
+        with self.lock:
+            self.total = None
+
+
+def wants_minimal(request):
+    # ?return=minimal or an RFC 7240 "Prefer: return=minimal" header
+    if request.args.get('return') == 'minimal':
+        return True
+    preferences = request.headers.get('Prefer', '').replace(';', ',')
+    return 'return=minimal' in (p.strip() for p in preferences.split(','))
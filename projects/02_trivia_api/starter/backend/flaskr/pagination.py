@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+from sqlalchemy import func
+
+PER_PAGE = 10
+MAX_PER_PAGE = 100
+
+Page = namedtuple('Page', ['items', 'total', 'next_cursor', 'prev_cursor'])
+
+
+def count_rows(selection, key):
+    # COUNT(*) over the selection's filters, no rows are loaded
+    return selection.with_entities(func.count(key)).order_by(None).scalar()
+
+
+def paginate(request, selection, key, per_page=PER_PAGE, rank=None):
+    '''
+    Counts and pages any query in the database. Compose the selection with
+    its filters (category, search...) and pass the unique column to page on
+    as key; the page is ordered by key.
+
+    ?after=<key> and ?before=<key> page by keyset so deep pages cost the same
+    as the first one; next_cursor and prev_cursor are the keys to pass back.
+    ?page=<n> (LIMIT/OFFSET) and ?limit=<n> are accepted too.
+
+    A ranked selection (e.g. search relevance) passes its ordering as rank,
+    key then only breaks ties and pages are numbered, without cursors.
+    '''
+    items_limit = request.args.get('limit', per_page, type=int)
+    items_limit = min(max(items_limit, 1), MAX_PER_PAGE)
+    after = request.args.get('after', None, type=int)
+    before = request.args.get('before', None, type=int)
+
+    # Fetch one extra row to know whether there is a further page
+    if rank is not None:
+        selected_page = max(request.args.get('page', 1, type=int), 1)
+        items = selection.order_by(rank, key).limit(items_limit).offset(
+          (selected_page - 1) * items_limit).all()
+        has_next = has_prev = False
+    elif after is not None:
+        items = selection.filter(key > after).order_by(key).limit(
+          items_limit + 1).all()
+        has_next, has_prev = len(items) > items_limit, after > 0
+        items = items[:items_limit]
+    elif before is not None:
+        items = selection.filter(key < before).order_by(key.desc()).limit(
+          items_limit + 1).all()
+        has_next, has_prev = True, len(items) > items_limit
+        items = items[:items_limit][::-1]
+    else:
+        selected_page = max(request.args.get('page', 1, type=int), 1)
+        items = selection.order_by(key).limit(items_limit + 1).offset(
+          (selected_page - 1) * items_limit).all()
+        has_next, has_prev = len(items) > items_limit, selected_page > 1
+        items = items[:items_limit]
+
+    cursor = key.key
+    return Page(
+        items=items,
+        total=count_rows(selection, key),
+        next_cursor=getattr(items[-1], cursor) if items and has_next else None,
+        prev_cursor=getattr(items[0], cursor) if items and has_prev else None
+    )
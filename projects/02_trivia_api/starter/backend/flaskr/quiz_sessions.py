@@ -0,0 +1,102 @@
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+QUIZ_SESSION_TTL = 3600
+MAX_QUIZ_SESSIONS = 10000
+
+# A session is a pre-shuffled deck of question ids. Drawing returns
+# (question id, questions remaining); once the deck is exhausted the draw
+# returns (None, 0) and the session is removed, later draws raise KeyError.
+
+
+class MemorySessionStore:
+    '''
+    In-process store, decks are int arrays kept in draw order from the end so
+    every draw is an O(1) pop. Sessions expire after ttl seconds without a
+    draw; the least recently used are evicted beyond max_sessions.
+    '''
+
+    def __init__(self, ttl=QUIZ_SESSION_TTL, max_sessions=MAX_QUIZ_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        # Sessions are kept in last-used order, expired ones sit at the front
+        while self.sessions:
+            session_id, (_, expires_at) = next(iter(self.sessions.items()))
+            if expires_at > now and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[session_id]
+
+    def create(self, question_ids):
+        session_id = secrets.token_urlsafe(16)
+        deck = array('l', reversed(question_ids))
+        now = time.monotonic()
+        with self.lock:
+            self.sessions[session_id] = (deck, now + self.ttl)
+            self._evict(now)
+        return session_id
+
+    def draw(self, session_id):
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            deck, _ = self.sessions.pop(session_id)
+            if not deck:
+                return None, 0
+            question_id = deck.pop()
+            self.sessions[session_id] = (deck, now + self.ttl)
+            return question_id, len(deck)
+
+
+class RedisSessionStore:
+    '''
+    Shares sessions between workers through a Redis-compatible client
+    (rpush/lpop/llen/expire/pipeline). Each deck is a list ending with a 0
+    sentinel that marks the end of the quiz.
+    '''
+
+    def __init__(self, client, ttl=QUIZ_SESSION_TTL, prefix='trivia:quiz:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def create(self, question_ids):
+        session_id = secrets.token_urlsafe(16)
+        key = self.prefix + session_id
+        pipe = self.client.pipeline()
+        pipe.rpush(key, *question_ids, 0)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return session_id
+
+    def draw(self, session_id):
+        key = self.prefix + session_id
+        pipe = self.client.pipeline()
+        pipe.lpop(key)
+        pipe.llen(key)
+        pipe.expire(key, self.ttl)
+        question_id, remaining, _ = pipe.execute()
+        if question_id is None:
+            raise KeyError(session_id)
+        question_id = int(question_id)
+        if question_id == 0:
+            return None, 0
+        return question_id, remaining - 1
+
+
+def create_session_store(config):
+    # QUIZ_SESSION_REDIS_URL switches to the shared Redis store
+    ttl = config.get('QUIZ_SESSION_TTL', QUIZ_SESSION_TTL)
+    if config.get('QUIZ_SESSION_REDIS_URL'):
+        # Optional dependency, only needed when Redis is configured
+        import redis
+        client = redis.Redis.from_url(config['QUIZ_SESSION_REDIS_URL'])
+        return RedisSessionStore(client, ttl)
+    return MemorySessionStore(ttl, config.get('MAX_QUIZ_SESSIONS',
+                                              MAX_QUIZ_SESSIONS))
@@ -0,0 +1,94 @@
+import re
+
+from sqlalchemy import DDL, event, func, literal_column
+from sqlalchemy.sql import table, column
+
+from models import db, Question
+
+# Full-text search over question and answer text. PostgreSQL matches a
+# tsvector expression backed by a GIN index, SQLite an FTS5 table kept in
+# sync by triggers (used by the tests and benchmarks). Other databases fall
+# back to an unindexed ILIKE.
+
+# 'simple' keeps every word (no stop words or stemming), like the old ILIKE
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+# Must stay identical to the indexed expression for PostgreSQL to use it
+search_document = func.to_tsvector(
+  SEARCH_CONFIG,
+  func.coalesce(Question.question, '') + ' ' +
+  func.coalesce(Question.answer, ''))
+
+POSTGRESQL_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_questions_search ON questions USING gin "
+    "(to_tsvector('simple'::regconfig, "
+    "coalesce(question, '') || ' ' || coalesce(answer, '')))",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+    "question, answer, content='questions', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON "
+    "questions BEGIN INSERT INTO questions_fts(rowid, question, answer) "
+    "VALUES (new.id, new.question, new.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON "
+    "questions BEGIN INSERT INTO questions_fts(questions_fts, rowid, "
+    "question, answer) VALUES ('delete', old.id, old.question, old.answer); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE ON "
+    "questions BEGIN INSERT INTO questions_fts(questions_fts, rowid, "
+    "question, answer) VALUES ('delete', old.id, old.question, old.answer); "
+    "INSERT INTO questions_fts(rowid, question, answer) "
+    "VALUES (new.id, new.question, new.answer); END",
+]
+
+# create_all() builds the search index along with a fresh questions table,
+# existing databases get it from the migration
+for statement in POSTGRESQL_DDL:
+    event.listen(Question.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_DDL:
+    event.listen(Question.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='sqlite'))
+questions_fts = table('questions_fts', column('rowid'), column('rank'))
+
+event.listen(Question.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS questions_fts').execute_if(
+               dialect='sqlite'))
+
+
+def search_words(term):
+    return re.findall(r'\w+', (term or '').lower())
+
+
+def search_selection(term):
+    '''
+    Returns (selection, rank) for the questions matching every word of term,
+    the last word as a prefix, to pass on to paginate(). rank orders the best
+    matches first, it is None when there is no relevance to order by. An
+    empty term matches every question.
+    '''
+    words = search_words(term)
+    if not words:
+        return Question.query, None
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        # Same semantics as the FTS5 query: only the last word is a prefix
+        query = func.to_tsquery(SEARCH_CONFIG, ' & '.join(
+          words[:-1] + [f'{words[-1]}:*']))
+        selection = Question.query.filter(search_document.op('@@')(query))
+        return selection, func.ts_rank_cd(search_document, query).desc()
+
+    if dialect == 'sqlite':
+        query = ' '.join(f'"{word}"' for word in words) + '*'
+        selection = Question.query.join(
+          questions_fts, questions_fts.c.rowid == Question.id).filter(
+          literal_column('questions_fts').op('MATCH')(query))
+        # FTS5 rank is bm25(), lower is better
+        return selection, questions_fts.c.rank
+
+    selection = Question.query.filter(*[
+        Question.question.ilike(f'%{word}%') | Question.answer.ilike(
+          f'%{word}%') for word in words])
+    return selection, None
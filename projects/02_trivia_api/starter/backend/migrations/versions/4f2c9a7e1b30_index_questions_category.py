@@ -0,0 +1,27 @@
+"""Index questions.category
+
+Revision ID: 4f2c9a7e1b30
+Revises: 
+Create Date: 2026-10-17 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2c9a7e1b30'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Applies on top of the schema restored from trivia.psql. setup_db()'s
+# create_all() already builds the index on a fresh database, hence IF NOT EXISTS
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_questions_category '
+               'ON questions (category)')
+
+
+def downgrade():
+    op.drop_index('ix_questions_category', table_name='questions')
@@ -0,0 +1,58 @@
+"""Full-text question search
+
+Revision ID: 7d1e5b3c9a42
+Revises: 4f2c9a7e1b30
+Create Date: 2026-10-17 14:41:08.915230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1e5b3c9a42'
+down_revision = '4f2c9a7e1b30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # GIN index over the tsvector expression used by flaskr/search.py
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_questions_search ON questions "
+            "USING gin (to_tsvector('simple'::regconfig, "
+            "coalesce(question, '') || ' ' || coalesce(answer, '')))")
+    elif dialect == 'sqlite':
+        # External content FTS5 table kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+            "question, answer, content='questions', content_rowid='id')")
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT "
+            "ON questions BEGIN INSERT INTO questions_fts(rowid, question, "
+            "answer) VALUES (new.id, new.question, new.answer); END")
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE "
+            "ON questions BEGIN INSERT INTO questions_fts(questions_fts, "
+            "rowid, question, answer) VALUES ('delete', old.id, "
+            "old.question, old.answer); END")
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE "
+            "ON questions BEGIN INSERT INTO questions_fts(questions_fts, "
+            "rowid, question, answer) VALUES ('delete', old.id, "
+            "old.question, old.answer); INSERT INTO questions_fts(rowid, "
+            "question, answer) VALUES (new.id, new.question, new.answer); "
+            "END")
+        op.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_questions_search')
+    elif dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS questions_fts_{trigger}')
+        op.execute('DROP TABLE IF EXISTS questions_fts')
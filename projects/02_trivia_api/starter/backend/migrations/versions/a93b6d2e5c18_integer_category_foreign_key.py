@@ -0,0 +1,91 @@
+"""Integer category foreign key and (category, id) index on questions
+
+Revision ID: a93b6d2e5c18
+Revises: 7d1e5b3c9a42
+Create Date: 2026-10-17 16:05:44.120953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93b6d2e5c18'
+down_revision = '7d1e5b3c9a42'
+branch_labels = None
+depends_on = None
+
+
+# SQLite rebuilds the table to change the column, which drops the triggers
+# keeping the search table (7d1e5b3c9a42) in sync
+FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON "
+    "questions BEGIN INSERT INTO questions_fts(rowid, question, answer) "
+    "VALUES (new.id, new.question, new.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON "
+    "questions BEGIN INSERT INTO questions_fts(questions_fts, rowid, "
+    "question, answer) VALUES ('delete', old.id, old.question, old.answer); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE ON "
+    "questions BEGIN INSERT INTO questions_fts(questions_fts, rowid, "
+    "question, answer) VALUES ('delete', old.id, old.question, old.answer); "
+    "INSERT INTO questions_fts(rowid, question, answer) "
+    "VALUES (new.id, new.question, new.answer); END",
+]
+
+
+def has_category_foreign_key(bind):
+    return any(fk['referred_table'] == 'categories'
+               for fk in sa.inspect(bind).get_foreign_keys('questions'))
+
+
+def replace_category_index():
+    # (category, id) serves both the filter and the id ordering of its pages
+    op.execute('DROP INDEX IF EXISTS ix_questions_category')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_questions_category_id '
+               'ON questions (category, id)')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('questions') as batch_op:
+            batch_op.alter_column('category', type_=sa.Integer(),
+                                  existing_type=sa.String())
+            batch_op.create_foreign_key('category', 'categories',
+                                        ['category'], ['id'],
+                                        onupdate='CASCADE',
+                                        ondelete='SET NULL')
+        for statement in FTS_TRIGGERS:
+            op.execute(statement)
+        replace_category_index()
+        return
+
+    # Databases restored from trivia.psql already have the integer column and
+    # the constraint, ones built by create_all() from the old model do not
+    op.alter_column('questions', 'category', type_=sa.Integer(),
+                    existing_type=sa.String(),
+                    postgresql_using='category::integer')
+    if not has_category_foreign_key(bind):
+        op.create_foreign_key('category', 'questions', 'categories',
+                              ['category'], ['id'], onupdate='CASCADE',
+                              ondelete='SET NULL')
+    replace_category_index()
+
+
+def downgrade():
+    bind = op.get_bind()
+    op.drop_index('ix_questions_category_id', table_name='questions')
+    op.create_index('ix_questions_category', 'questions', ['category'])
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('questions') as batch_op:
+            batch_op.drop_constraint('category', type_='foreignkey')
+            batch_op.alter_column('category', type_=sa.String(),
+                                  existing_type=sa.Integer())
+        for statement in FTS_TRIGGERS:
+            op.execute(statement)
+        return
+
+    op.drop_constraint('category', 'questions', type_='foreignkey')
+    op.alter_column('questions', 'category', type_=sa.String(),
+                    existing_type=sa.Integer())
@@ -1,6 +1,8 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, \
+  create_engine
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 import json
 from dotenv import load_dotenv
 
@@ -20,6 +22,7 @@ def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.app = app
     db.init_app(app)
+    Migrate(app, db)
     db.create_all()
 
 '''
@@ -28,11 +31,15 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # Serves the category filter and the id ordering of its pages together
+  __table_args__ = (Index('ix_questions_category_id', 'category', 'id'),)
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', name='category',
+                                         onupdate='CASCADE',
+                                         ondelete='SET NULL'))
   difficulty = Column(Integer)
 
   def __init__(self, question, answer, category, difficulty):
@@ -50,6 +50,15 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['categories'])
         self.assertTrue(len(data['categories']))
 
+    # Test categories are not resent while the ETag matches
+    def test_304_retrieve_all_categories_not_modified(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories',
+                                headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
     # Test successful retrieval of paginated questions
     def test_retrieve_paginated_questions(self):
         res = self.client().get('/questions')
@@ -70,6 +79,23 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], False)
         self.assertEqual(data['message'], 'resource not found')
 
+    # Test paging forward and back with next_cursor/prev_cursor
+    def test_retrieve_questions_by_cursor(self):
+        first = json.loads(self.client().get('/questions?limit=2').data)
+        res = self.client().get(
+            f"/questions?limit=2&after={first['next_cursor']}")
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(len(data['questions']), 2)
+        self.assertGreater(data['questions'][0]['id'], first['next_cursor'])
+        self.assertEqual(data['total_questions'], first['total_questions'])
+
+        back = json.loads(self.client().get(
+            f"/questions?limit=2&before={data['prev_cursor']}").data)
+        self.assertEqual(back['questions'], first['questions'])
+
     # Test successful deletion of a question
     def test_delete_question(self):
         # Create a new question
@@ -85,6 +111,27 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertEqual(data['deleted'], create_id)
 
+    # Test minimal create/delete responses carry the id and running total
+    def test_create_and_delete_question_return_minimal(self):
+        total = json.loads(self.client().get('/questions').data)[
+            'total_questions']
+        res = self.client().post('/questions', json=self.new_question,
+                                 headers={'Prefer': 'return=minimal'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['Preference-Applied'], 'return=minimal')
+        self.assertNotIn('questions', data)
+        self.assertEqual(data['total_questions'], total + 1)
+
+        res = self.client().delete(
+            f"/questions/{data['created']}?return=minimal")
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('questions', data)
+        self.assertEqual(data['total_questions'], total)
+
     # Test unsuccessful deletion of a question that does not exist
     def test_404_delete_question(self):
         res = self.client().delete('/questions/999')
@@ -104,6 +151,47 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['created'])
         self.assertTrue(len(data['questions']))
 
+    # Test successful bulk import of NDJSON questions
+    def test_bulk_create_questions(self):
+        body = '\n'.join(
+            json.dumps(dict(self.new_question, question=f'Bulk {n}'))
+            for n in range(3))
+        res = self.client().post('/questions/bulk', data=body,
+                                 content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['created'], 3)
+
+    # Test unsuccessful bulk import - one invalid line rejects every line
+    def test_422_bulk_create_questions_invalid_line(self):
+        total = json.loads(self.client().get('/questions').data)[
+            'total_questions']
+        body = json.dumps(self.new_question) + '\n' + json.dumps(
+            dict(self.new_question, difficulty=9))
+        res = self.client().post('/questions/bulk', data=body,
+                                 content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['errors'][0]['line'], 2)
+        self.assertEqual(json.loads(self.client().get('/questions').data)[
+            'total_questions'], total)
+
+    # Test successful export of every question as NDJSON
+    def test_export_questions(self):
+        total = json.loads(self.client().get('/questions').data)[
+            'total_questions']
+        res = self.client().get('/questions/export')
+        lines = res.data.decode().splitlines()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(lines), total)
+        self.assertIn('answer', json.loads(lines[0]))
+
     # Test unsuccessful creation of question where method is not allowed
     def test_405_create_question_method_not_allowed(self):
         res = self.client().post('/questions/1', json=self.new_question)
@@ -135,6 +223,17 @@ class TriviaTestCase(unittest.TestCase):
         self.assertFalse(len(data['questions']))
         self.assertEqual(data['total_questions'], 0)
 
+    # Test search results are paginated and counted in full
+    def test_search_questions_paginated(self):
+        res = self.client().post('/questions/search?limit=1',
+                                 json={'searchTerm': "the"})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(len(data['questions']), 1)
+        self.assertGreater(data['total_questions'], 1)
+
     # Test successful retrieval of questions by category
     def test_retrieve_questions_by_category(self):
         res = self.client().get('/categories/3/questions')
@@ -167,6 +266,28 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertIsNotNone(data['question'])
 
+    # Test quiz never repeats previous questions and ends when none are left
+    def test_quizzes_skips_previous_questions(self):
+        category = json.loads(self.client().get(
+            '/categories/1/questions?limit=100').data)
+        ids = [question['id'] for question in category['questions']]
+
+        res = self.client().post('/quizzes', json={
+            'previous_questions': ids[1:],
+            'quiz_category': {'type': 'science', 'id': 1}
+            })
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['id'], ids[0])
+
+        res = self.client().post('/quizzes', json={
+            'previous_questions': ids,
+            'quiz_category': {'type': 'science', 'id': 1}
+            })
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(data['question'])
+
     # Test unsuccessful quiz - no data - Server fails
     def test_500_test_quizzes_no_data(self):
         res = self.client().post('/quizzes')
@@ -177,6 +298,39 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['message'], 'internal server error')
 
 
+    # Test a quiz session plays every question of the category once
+    def test_quiz_session(self):
+        res = self.client().post('/quizzes/sessions', json={
+            'quiz_category': {'type': 'science', 'id': 1}
+            })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['total_questions'])
+
+        url = f"/quizzes/sessions/{data['session_id']}/next"
+        played = []
+        for _ in range(data['total_questions']):
+            question = json.loads(self.client().post(url).data)['question']
+            self.assertEqual(question['category'], 1)
+            played.append(question['id'])
+        self.assertEqual(len(set(played)), data['total_questions'])
+
+        # Exhausted deck returns no question, then the session is closed
+        data = json.loads(self.client().post(url).data)
+        self.assertIsNone(data['question'])
+        self.assertEqual(self.client().post(url).status_code, 404)
+
+    # Test unsuccessful quiz session - no quiz category
+    def test_400_create_quiz_session_no_category(self):
+        res = self.client().post('/quizzes/sessions', json={})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['message'], 'bad request')
+
 # Make the tests conveniently executable
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,280 @@
+'''
+Benchmarks
+    measures what authentication adds to every protected request and what
+    GET /drinks costs on a large menu
+
+    Signs tokens with a throwaway RSA key served from a local JWKS endpoint
+    (with an artificial round trip standing in for Auth0), then times token
+    verification fetching the JWKS on every call, as auth.py used to, against
+    the cached key store alone and with the verified-token cache in front.
+    Then seeds a throwaway SQLite database with --drinks drinks and times
+    GET /drinks with cold and warm projection and menu caches, and as a
+    conditional request, against decoding every recipe twice per request
+    as Drink.short() used to. Last, times worker cold starts (a fresh
+    interpreter up to the first GET /drinks) with and without the drop and
+    recreate every import of api.py used to do.
+
+    python bench.py [--requests 200] [--latency-ms 50] [--drinks 10000]
+                    [--repeat 5] [--starts 5]
+'''
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+from Crypto.PublicKey import RSA
+from flask import jsonify
+from jose import jwt
+
+KID = 'bench-key'
+
+
+def b64url_uint(value):
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def make_key():
+    private_key = RSA.generate(2048)
+    jwks = {'keys': [{
+        'kty': 'RSA', 'kid': KID, 'use': 'sig', 'alg': 'RS256',
+        'n': b64url_uint(private_key.n), 'e': b64url_uint(private_key.e),
+    }]}
+    return private_key.export_key().decode(), jwks
+
+
+def serve_jwks(jwks, latency):
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Cache-Control', 'public, max-age=600')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/.well-known/jwks.json'
+
+
+def make_token(private_pem, auth):
+    now = int(time.time())
+    claims = {
+        'iss': f'https://{auth.AUTH0_DOMAIN}/',
+        'sub': 'auth0|bench',
+        'aud': auth.API_AUDIENCE,
+        'iat': now,
+        'exp': now + 3600,
+        'permissions': ['get:drinks-detail'],
+    }
+    return jwt.encode(claims, private_pem, algorithm='RS256',
+                      headers={'kid': KID})
+
+
+def legacy_verify_decode_jwt(token, auth):
+    # verify_decode_jwt as it was: the JWKS is downloaded for every request
+    jsonurl = urlopen(auth.AUTH0_JWKS_URL)
+    jwks = json.loads(jsonurl.read())
+    kid = jwt.get_unverified_header(token)['kid']
+    rsa_key = next(key for key in jwks['keys'] if key['kid'] == kid)
+    return jwt.decode(token, rsa_key, algorithms=auth.ALGORITHMS,
+                      audience=auth.API_AUDIENCE,
+                      issuer=f'https://{auth.AUTH0_DOMAIN}/')
+
+
+def verify_uncached(token, auth):
+    # Cached keys, but the signature is checked on every request
+    auth.token_cache.clear()
+    return auth.verify_decode_jwt(token)
+
+
+def timings(verify, token, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        verify(token)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f'  {label:<8} mean {statistics.mean(samples) * 1000:7.2f} ms  '
+          f'p50 {statistics.median(samples) * 1000:7.2f} ms  '
+          f'p95 {p95 * 1000:7.2f} ms')
+
+
+def bench_auth(args):
+    private_pem, jwks = make_key()
+    server, url = serve_jwks(jwks, args.latency_ms / 1000)
+    os.environ['AUTH0_JWKS_URL'] = url
+    from src.auth import auth
+
+    token = make_token(private_pem, auth)
+    print(f'Token verification, {args.requests} requests, '
+          f'{args.latency_ms:g} ms JWKS round trip')
+    report('before', timings(lambda t: legacy_verify_decode_jwt(t, auth),
+                             token, args.requests))
+    fetches = auth.jwks_store.fetches
+    report('jwks', timings(lambda t: verify_uncached(t, auth),
+                           token, args.requests))
+    auth.token_cache.clear()
+    hits, misses = auth.token_cache.hits, auth.token_cache.misses
+    report('tokens', timings(auth.verify_decode_jwt, token, args.requests))
+    print(f'  JWKS downloads: before {args.requests}, '
+          f'after {auth.jwks_store.fetches - fetches}')
+    print(f'  token cache: {auth.token_cache.hits - hits} hits, '
+          f'{auth.token_cache.misses - misses} misses')
+
+    auth.jwks_store.stop()
+    server.shutdown()
+
+
+def seed_drinks(db, Drink, num_drinks):
+    from src.database.models import new_version
+    db.session.bulk_insert_mappings(Drink, [{
+        'title': f'Drink {n}',
+        'recipe': [{'name': 'espresso', 'color': 'brown', 'parts': 1},
+                   {'name': 'milk', 'color': 'white', 'parts': 2 + n % 3},
+                   {'name': 'foam', 'color': 'grey', 'parts': 1}],
+        'version': new_version(),
+    } for n in range(num_drinks)])
+    db.session.commit()
+
+
+def legacy_short_menu(db):
+    # GET /drinks as it was: each recipe decoded twice (once for a debug print)
+    rows = db.session.execute(
+        db.text('SELECT id, title, recipe FROM drink ORDER BY id')).fetchall()
+    drinks = []
+    for id, title, recipe in rows:
+        json.loads(recipe)
+        drinks.append({
+            'id': id,
+            'title': title,
+            'recipe': [{'color': r['color'], 'parts': r['parts']}
+                       for r in json.loads(recipe)]
+        })
+    return drinks
+
+
+def bench_drinks(args):
+    from src.api import create_app
+    from src.database.models import db, db_drop_and_create_all, Drink, projection_cache
+
+    database = os.path.join(tempfile.gettempdir(), 'coffee_bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    menu_cache = app.menu_cache
+
+    print(f'GET /drinks, {args.drinks} drinks')
+    client = app.test_client()
+    with app.app_context():
+        db_drop_and_create_all()
+        seed_drinks(db, Drink, args.drinks)
+
+        def before():
+            with app.test_request_context('/drinks'):
+                return jsonify({'success': True,
+                                'drinks': legacy_short_menu(db)}).get_data()
+
+        def cold():
+            projection_cache.clear()
+            menu_cache.bump()
+            return client.get('/drinks').get_data()
+
+        def rebuilt():
+            # After a write: projections still cached, the body is rebuilt
+            menu_cache.bump()
+            return client.get('/drinks').get_data()
+
+        def warm():
+            return client.get('/drinks').get_data()
+
+        etag = client.get('/drinks').headers['ETag']
+
+        def not_modified():
+            response = client.get('/drinks', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            return response
+
+        assert before() == cold() == rebuilt() == warm()
+        for label, request in (('before', before), ('cold', cold),
+                               ('rebuilt', rebuilt), ('warm', warm),
+                               ('304', not_modified)):
+            elapsed = min(timings(lambda _: request(), None, args.repeat))
+            print(f'  {label:<8} best of {args.repeat} {elapsed * 1000:8.1f} ms')
+    os.remove(database)
+
+
+# Run in a fresh interpreter, prints seconds from start to the first response
+COLD_START = '''
+import sys, time
+start = time.perf_counter()
+from src.api import create_app
+from src.database.models import db_drop_and_create_all, db_seed
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+if sys.argv[2] == 'reset':
+    with app.app_context():
+        db_drop_and_create_all()
+        db_seed()
+assert app.test_client().get('/drinks').status_code == 200
+print(time.perf_counter() - start)
+'''
+
+
+def bench_startup(args):
+    from src.api import create_app
+    from src.database.models import db_init, db_seed
+
+    database = os.path.join(tempfile.gettempdir(), 'coffee_start.db')
+    uri = f'sqlite:///{database}'
+    with create_app({'SQLALCHEMY_DATABASE_URI': uri}).app_context():
+        db_init()
+        db_seed()
+
+    print(f'Worker cold start, best of {args.starts}')
+    here = os.path.dirname(os.path.abspath(__file__))
+    for label, mode in (('before', 'reset'), ('after', 'keep')):
+        elapsed = min(float(subprocess.run(
+            [sys.executable, '-c', COLD_START, uri, mode], cwd=here,
+            check=True, capture_output=True, text=True).stdout)
+            for _ in range(args.starts))
+        print(f'  {label:<8} {elapsed * 1000:8.1f} ms')
+    os.remove(database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2].strip())
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50,
+                        help='round trip added to every JWKS download')
+    parser.add_argument('--drinks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='GET /drinks runs per case, the best is reported')
+    parser.add_argument('--starts', type=int, default=5,
+                        help='cold starts per case, the best is reported')
+    args = parser.parse_args()
+
+    bench_auth(args)
+    bench_drinks(args)
+    bench_startup(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,23 @@
-import json
+import os
 from flask import request, _request_ctx_stack, abort
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from .jwks import JWKSKeyStore, JWKSError
+from .token_cache import TokenCache
 
 
 AUTH0_DOMAIN = 'fsnd-lawal.eu.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'http://localhost:5000'
+# Point at a local JWKS file or HTTP stand-in to run without Auth0
+AUTH0_JWKS_URL = os.environ.get(
+    'AUTH0_JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+# Signing keys are cached by kid, see jwks.py
+jwks_store = JWKSKeyStore(AUTH0_JWKS_URL)
+# Verified claims by token hash, see token_cache.py
+token_cache = TokenCache()
 
 # AuthError Exception
 '''
@@ -116,8 +126,11 @@ def check_permissions(permission, payload):
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
+    # Tokens are resent until they expire, verify each one only once
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     unverified_header = jwt.get_unverified_header(token)
     rsa_key = {}
 
@@ -127,15 +140,22 @@ def verify_decode_jwt(token):
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    try:
+        key = jwks_store.get_key(unverified_header['kid'])
+    except JWKSError:
+        raise AuthError({
+            'code': 'jwks_unavailable',
+            'description': 'Unable to load the signing keys.'
+        }, 503)
+
+    if key:
+        rsa_key = {
+            'kty': key['kty'],
+            'kid': key['kid'],
+            'use': key['use'],
+            'n': key['n'],
+            'e': key['e']
+        }
 
     if rsa_key:
         try:
@@ -146,6 +166,7 @@ def verify_decode_jwt(token):
                 audience=API_AUDIENCE,
                 issuer=f'https://{AUTH0_DOMAIN}/'
             )
+            token_cache.set(token, payload)
 
             return payload
 
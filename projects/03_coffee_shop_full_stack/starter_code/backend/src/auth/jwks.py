@@ -0,0 +1,142 @@
+import json
+import re
+import threading
+import time
+from urllib.request import urlopen
+
+# Used when the JWKS response carries no Cache-Control max-age
+DEFAULT_TTL = 600
+MAX_TTL = 24 * 3600
+# Unknown kids and failed fetches never refetch more often than this
+MIN_REFETCH_INTERVAL = 30
+# The background thread refreshes once this share of the TTL has passed
+REFRESH_AHEAD = 0.8
+FETCH_TIMEOUT = 5
+
+'''
+JWKSError
+raised when no signing keys could ever be loaded
+'''
+
+
+class JWKSError(Exception):
+    pass
+
+
+def cache_max_age(cache_control):
+    # Seconds from a Cache-Control header, None when it does not say
+    if not cache_control:
+        return None
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else None
+
+
+'''
+JWKSKeyStore
+    caches the identity provider's signing keys by kid
+
+    source is the JWKS URL (https://, or http:// for a local stand-in) or a
+    local JWKS file (a path or file:// URL). Keys live for the response's
+    Cache-Control max-age, a daemon thread refreshes them before they expire
+    and a token signed with an unknown kid (key rotation) triggers one
+    refetch shared by every waiting request. If a refresh fails the last
+    keys keep being served.
+'''
+
+
+class JWKSKeyStore:
+    def __init__(self, source, ttl=DEFAULT_TTL,
+                 min_refetch_interval=MIN_REFETCH_INTERVAL, background=True):
+        self.source = source
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.background = background
+        self.keys = {}
+        self.attempts = 0
+        self.fetches = 0
+        self.fetched_at = 0.0
+        self.attempted_at = 0.0
+        self.expires_at = 0.0
+        self.last_ttl = ttl
+        self.refresh_lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def fetch(self):
+        # Returns ({kid: key}, ttl in seconds) read from the source
+        self.fetches += 1
+        if self.source.startswith(('https://', 'http://')):
+            with urlopen(self.source, timeout=FETCH_TIMEOUT) as response:
+                jwks = json.loads(response.read())
+                ttl = cache_max_age(response.headers.get('Cache-Control'))
+        else:
+            path = self.source[len('file://'):] \
+                if self.source.startswith('file://') else self.source
+            with open(path) as jwks_file:
+                jwks = json.load(jwks_file)
+            ttl = None
+        if ttl is None:
+            ttl = self.ttl
+        ttl = min(max(ttl, self.min_refetch_interval), MAX_TTL)
+        return {key['kid']: key for key in jwks['keys'] if 'kid' in key}, ttl
+
+    def refresh(self):
+        # Single flight: callers queued behind a fetch reuse its outcome
+        seen = self.attempts
+        with self.refresh_lock:
+            if self.attempts == seen:
+                self._refresh()
+                self.attempts += 1
+        if not self.keys:
+            raise JWKSError(f'Unable to load JWKS from {self.source}')
+
+    def _refresh(self):
+        now = self.attempted_at = time.monotonic()
+        try:
+            keys, ttl = self.fetch()
+        except (OSError, ValueError, KeyError):
+            # Keep serving the stale keys (if any), retry after a pause
+            self.expires_at = now + self.min_refetch_interval
+            return
+        self.keys = keys
+        self.fetched_at = now
+        self.expires_at = now + ttl
+        self.last_ttl = ttl
+        if self.background and self.thread is None:
+            self.start()
+
+    def get_key(self, kid):
+        if time.monotonic() >= self.expires_at:
+            # Normally the background thread got there first
+            self.refresh()
+        elif not self.keys:
+            # The last fetch failed, wait for its pause to end
+            raise JWKSError(f'Unable to load JWKS from {self.source}')
+        key = self.keys.get(kid)
+        if key is None and time.monotonic() - self.attempted_at >= \
+                self.min_refetch_interval:
+            # Possibly a rotated key, look again
+            self.refresh()
+            key = self.keys.get(kid)
+        return key
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name='jwks-refresh')
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            refresh_at = self.fetched_at + self.last_ttl * REFRESH_AHEAD
+            if refresh_at <= now:
+                # The last refresh failed, retry when its pause ends
+                refresh_at = self.expires_at
+            if self.stopped.wait(max(refresh_at - now, 1)):
+                return
+            self.refresh()
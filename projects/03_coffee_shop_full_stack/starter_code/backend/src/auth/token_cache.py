@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+
+'''
+TokenCache
+    remembers the claims of bearer tokens that already passed verification
+
+    A client sends the same token on every request until it expires, so the
+    RSA signature check only needs to run once per token. Entries are keyed
+    by a SHA-256 of the token (the raw token is never kept), expire at the
+    token's exp claim and the least recently used entry is dropped once
+    max_entries is reached. Tokens without an exp claim are not cached.
+    Cached payloads are shared between requests and must not be modified.
+'''
+
+
+class TokenCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        # The verified payload, or None when the token has to be verified
+        key = self.key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token, payload):
+        expires_at = payload.get('exp')
+        if not isinstance(expires_at, (int, float)) or \
+                expires_at <= time.time():
+            return
+        key = self.key(token)
+        with self.lock:
+            self.entries[key] = (payload, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries),
+                    'hits': self.hits, 'misses': self.misses}
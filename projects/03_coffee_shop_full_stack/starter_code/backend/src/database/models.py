@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import Column, String, Integer
+from uuid import uuid4
+from sqlalchemy import Column, String, Integer, JSON, inspect
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -9,13 +10,17 @@ database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filenam
 
 db = SQLAlchemy()
 
+# Serialized drinks by id: (version, short, long), see Drink.projections()
+# versions are random, so a reused id or another process' reset never matches
+projection_cache = {}
+
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
 '''
 
 
-def setup_db(app):
+def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.app = app
@@ -33,16 +38,118 @@ db_drop_and_create_all()
 def db_drop_and_create_all():
     db.drop_all()
     db.create_all()
-    # add one demo row which is helping in POSTMAN test
-#     drink = Drink(
-#         title='water',
-#         recipe='[{"name": "water", "color": "blue", "parts": 1}]'
-#     )
+    projection_cache.clear()
+
+
+'''
+db_init()
+    creates the missing tables and adds the columns introduced since an
+    existing database was created, never drops anything
+    safe to run again, and while the app is serving
+'''
+
+
+def db_init():
+    db.create_all()
+    columns = {column['name'] for column in inspect(db.engine).get_columns('drink')}
+    with db.engine.begin() as connection:
+        if 'version' not in columns:
+            # Databases created before drinks were versioned
+            connection.execute(db.text(
+                "ALTER TABLE drink ADD COLUMN version VARCHAR(32) NOT NULL DEFAULT ''"))
+        # Rows without a random version (or with an old counter) get one
+        unversioned = [id for id, version in
+                       connection.execute(db.text('SELECT id, version FROM drink'))
+                       if len(str(version)) != 32]
+        for id in unversioned:
+            connection.execute(db.text('UPDATE drink SET version = :version WHERE id = :id'),
+                               {'version': new_version(), 'id': id})
+
+
+# demo rows which are helping in POSTMAN test
+DEMO_DRINKS = [
+    {'title': 'water', 'recipe': [{'name': 'water', 'color': 'blue', 'parts': 1}]},
+    {'title': 'matcha shake', 'recipe': [{'name': 'milk', 'color': 'grey', 'parts': 1},
+                                         {'name': 'matcha', 'color': 'green', 'parts': 3}]},
+    {'title': 'flatwhite', 'recipe': [{'name': 'milk', 'color': 'grey', 'parts': 3},
+                                      {'name': 'coffee', 'color': 'brown', 'parts': 1}]},
+]
+
+'''
+db_seed()
+    adds the demo drinks whose title is not taken yet
+    returns how many were added
+'''
+
+
+def db_seed():
+    titles = {title for title, in db.session.query(Drink.title)}
+    drinks = [Drink(**drink) for drink in DEMO_DRINKS if drink['title'] not in titles]
+    db.session.add_all(drinks)
+    db.session.commit()
+    return len(drinks)
 
 
-# drink.insert()
 # ROUTES
 
+'''
+new_version()
+    a random drink version, unique across processes and database resets
+    (ids are reused after a delete, so a counter starting at 1 would not be)
+'''
+
+
+def new_version(_=None):
+    return uuid4().hex
+
+
+'''
+validate_recipe(recipe)
+    raises ValueError unless recipe is a list of
+    {'name': string, 'color': string, 'parts': number} ingredients
+    run before storing a recipe, short() and long() rely on that shape
+'''
+
+
+def validate_recipe(recipe):
+    if not isinstance(recipe, list):
+        raise ValueError('recipe must be a list of ingredients')
+    for ingredient in recipe:
+        if not isinstance(ingredient, dict):
+            raise ValueError('each ingredient must be an object')
+        if not isinstance(ingredient.get('name'), str) or \
+                not isinstance(ingredient.get('color'), str):
+            raise ValueError('each ingredient needs a name and a color')
+        parts = ingredient.get('parts')
+        if isinstance(parts, bool) or not isinstance(parts, (int, float)):
+            raise ValueError('each ingredient needs a number of parts')
+    return recipe
+
+
+'''
+cache_projections(id, version, title, recipe)
+    builds and caches the (version, short, long) forms of a drink
+'''
+
+
+def cache_projections(id, version, title, recipe):
+    cached = (
+        version,
+        {
+            'id': id,
+            'title': title,
+            'recipe': [{'color': r['color'], 'parts': r['parts']} for r in recipe]
+        },
+        {
+            'id': id,
+            'title': title,
+            'recipe': recipe
+        }
+    )
+    projection_cache[id] = cached
+    return cached
+
+
 '''
 Drink
 a persistent drink entity, extends the base SQLAlchemy Model
@@ -54,9 +161,25 @@ class Drink(db.Model):
     id = Column(Integer().with_variant(Integer, "sqlite"), primary_key=True)
     # String Title
     title = Column(String(80), unique=True)
-    # the ingredients blob - this stores a lazy json blob
+    # the ingredients, stored as JSON (text on SQLite, so older rows still load)
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
-    recipe = Column(String(180), nullable=False)
+    recipe = Column(JSON, nullable=False)
+    # replaced by SQLAlchemy on every INSERT and UPDATE, keys the cached projections
+    version = Column(String(32), nullable=False)
+
+    __mapper_args__ = {'version_id_col': version, 'version_id_generator': new_version}
+
+    '''
+    projections()
+        (version, short, long) for this drink, built once per version
+        the dicts are shared between requests and must not be modified
+    '''
+
+    def projections(self):
+        cached = projection_cache.get(self.id)
+        if cached is None or cached[0] != self.version:
+            cached = cache_projections(self.id, self.version, self.title, self.recipe)
+        return cached
 
     '''
     short()
@@ -64,13 +187,7 @@ class Drink(db.Model):
     '''
 
     def short(self):
-        print(json.loads(self.recipe))
-        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': short_recipe
-        }
+        return self.projections()[1]
 
     '''
     long()
@@ -78,11 +195,34 @@ class Drink(db.Model):
     '''
 
     def long(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': json.loads(self.recipe)
-        }
+        return self.projections()[2]
+
+    '''
+    menu(form)
+        every drink in id order, in 'short' or 'long' form
+        only the drinks whose cached projection is out of date have their
+        recipe read from the database
+    '''
+
+    @classmethod
+    def menu(cls, form='short'):
+        index = 1 if form == 'short' else 2
+        versions = db.session.query(cls.id, cls.version).order_by(cls.id).all()
+        stale = [id for id, version in versions
+                 if projection_cache.get(id, (None,))[0] != version]
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(stale), 500):
+            rows = db.session.query(cls.id, cls.version, cls.title, cls.recipe) \
+                .filter(cls.id.in_(stale[start:start + 500]))
+            for row in rows:
+                cache_projections(*row)
+        if len(projection_cache) > len(versions):
+            # Drinks deleted by another process
+            live = {id for id, _ in versions}
+            for id in [id for id in projection_cache if id not in live]:
+                projection_cache.pop(id, None)
+        return [cached[index] for cached in
+                (projection_cache.get(id) for id, _ in versions) if cached]
 
     '''
     insert()
@@ -110,6 +250,7 @@ class Drink(db.Model):
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        projection_cache.pop(self.id, None)
 
     '''
     update()
@@ -0,0 +1,46 @@
+import hashlib
+import threading
+import time
+
+# Writes made by other workers show up after at most this many seconds
+MENU_CACHE_TTL = 30
+
+'''
+MenuCache
+    the serialized GET /drinks body and its ETag, shared by every request
+
+    version is a menu version counter, bumped by the endpoints that add,
+    change or remove drinks. The body is built once per version (or once
+    every ttl seconds, for writes made by another worker), so an unchanged
+    menu is served, or answered with a 304, without touching the database.
+'''
+
+
+class MenuCache:
+    def __init__(self, ttl=MENU_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        # (version, body, etag, loaded_at)
+        self.entry = None
+        self.lock = threading.Lock()
+
+    def bump(self):
+        # Call after committing a change to the drinks table
+        with self.lock:
+            self.version += 1
+
+    def get(self, load):
+        # (body, etag) of the current menu, load() builds the body bytes
+        # (None for an empty menu) when the cached one is out of date
+        entry = self.entry
+        if entry is None or entry[0] != self.version or \
+                time.monotonic() - entry[3] > self.ttl:
+            # A bump during load() leaves this entry stale, it is rebuilt next time
+            version = self.version
+            body = load()
+            if body is None:
+                # An empty menu is not cached, it may be seeded from the CLI
+                return None, None
+            entry = (version, body, hashlib.sha1(body).hexdigest(), time.monotonic())
+            self.entry = entry
+        return entry[1], entry[2]
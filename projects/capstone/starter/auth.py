@@ -6,6 +6,8 @@ from urllib.request import urlopen
 from dotenv import load_dotenv
 import os
 
+from token_cache import TokenCache
+
 
 AUTH0_DOMAIN = os.environ.get("AUTH0_DOMAIN")
 ALGORITHMS = os.environ.get("ALGORITHMS")
@@ -16,6 +18,9 @@ ASSISTANT_TOKEN = os.environ.get("ASSISTANT_TOKEN")
 DIRECTOR_TOKEN = os.environ.get("DIRECTOR_TOKEN")
 PRODUCER_TOKEN = os.environ.get("PRODUCER_TOKEN")
 
+# Verified claims by token hash, see token_cache.py
+token_cache = TokenCache()
+
 # AuthError Exception
 '''
 AuthError Exception
@@ -123,6 +128,11 @@ verify_decode_jwt(token) method
 
 
 def verify_decode_jwt(token):
+    # Tokens are resent until they expire, verify each one only once
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
     jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
@@ -153,6 +163,7 @@ def verify_decode_jwt(token):
                 audience=API_AUDIENCE,
                 issuer=f'https://{AUTH0_DOMAIN}/'
             )
+            token_cache.set(token, payload)
 
             return payload
 
@@ -5,7 +5,7 @@ from flask_sqlalchemy import SQLAlchemy
 
 from app import create_app
 from models import setup_db, Movie, Actor
-from auth import ASSISTANT_TOKEN, DIRECTOR_TOKEN, PRODUCER_TOKEN
+from auth import ASSISTANT_TOKEN, DIRECTOR_TOKEN, PRODUCER_TOKEN, token_cache
 
 
 class CastingAgencyTestCase(unittest.TestCase):
@@ -200,6 +200,27 @@ class CastingAgencyTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 404)
         self.assertEqual(data['success'], False)
 
+    #----------------------------------------------------------------------------#
+    # Auth related tests
+    #----------------------------------------------------------------------------#
+
+    def test_repeated_token_verified_once(self):
+        token_cache.clear()
+        misses = token_cache.misses
+        hits = token_cache.hits
+        for _ in range(3):
+            res = self.client().get('/movies', headers=self.assistant_header)
+            self.assertEqual(res.status_code, 200)
+        self.assertEqual(token_cache.misses - misses, 1)
+        self.assertEqual(token_cache.hits - hits, 2)
+
+    def test_invalid_token_not_cached(self):
+        token_cache.clear()
+        header = {'Authorization': 'Bearer {}'.format(ASSISTANT_TOKEN[:-4])}
+        res = self.client().get('/movies', headers=header)
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(token_cache.stats()['entries'], 0)
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":